@@ -1,29 +1,43 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import os
-import base64
-import tempfile
+import io
 from pathlib import Path
 import logging
 from dotenv import load_dotenv
 import time  # 添加time模块用于计时
+import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 加载环境变量
 load_dotenv()
 
-from book_extractor import BookInfoExtractor
+from book_extractor import BookInfoExtractor, normalize_base64_image
 from douban_scraper import DoubanScraper
 from book_api import BookAPI
+from http_client import default_registry
+from rate_limiter import douban_rate_limiters
+from circuit_breaker import breaker_stats
+from html_parser import stream_stats
+from logging_setup import setup_logging, begin_request_sampling, logging_stats, DETAIL
+import metrics
 
 # 设置日志
 log_level = logging.INFO if os.getenv('FLASK_ENV') == 'production' else logging.DEBUG
-logging.basicConfig(
-    level=log_level,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-)
+setup_logging(log_level)
 logger = logging.getLogger(__name__)
 
+
+class InMemoryRequest(Request):
+    """上传的文件保存在内存中（大小已由 MAX_CONTENT_LENGTH 限制），不写临时文件"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 
 # 生产环境CORS配置
 if os.getenv('FLASK_ENV') == 'production':
@@ -35,6 +49,35 @@ else:
 
 # 配置
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 500))  # 批量搜索单次最多条数
+BATCH_CONCURRENCY = int(os.getenv('BATCH_SEARCH_CONCURRENCY', 4))  # 批量搜索访问豆瓣的并发上限
+
+# /metrics 中这些统计路径下的键（主机名、熔断器名称）作为标签
+STATS_LABEL_KEYS = {
+    'http_pool.hosts': 'host',
+    'douban_rate_limit': 'host',
+    'circuit_breakers': 'breaker'
+}
+
+
+@app.before_request
+def start_request_timing():
+    """为每个请求创建分阶段耗时表，并决定是否输出详细日志"""
+    metrics.start_request()
+    begin_request_sampling()
+
+
+@app.after_request
+def add_server_timing(response):
+    """写入 Server-Timing 响应头并记录请求耗时直方图"""
+    timings = metrics.current_timings()
+    if timings is not None:
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.request_duration.observe(
+            timings.total_ms() / 1000, endpoint, request.method, str(response.status_code)
+        )
+    return response
 
 @app.route('/', methods=['GET'])
 def index():
@@ -46,7 +89,11 @@ def index():
         'endpoints': {
             'health': '/health',
             'recognize': '/api/recognize-book',
-            'search': '/api/search-douban'
+            'search': '/api/search-douban',
+            'search_batch': '/api/search-douban/batch',
+            'isbn': '/api/lookup-isbn',
+            'stats': '/api/stats',
+            'metrics': '/metrics'
         }
     })
 
@@ -55,6 +102,37 @@ def health_check():
     """健康检查"""
     return jsonify({'status': 'ok', 'message': 'API服务正常运行'})
 
+def collect_stats() -> dict:
+    """运行时统计（/api/stats 和 /metrics 共用）"""
+    return {
+        'http_pool': default_registry.stats(),
+        'memory_cache': DoubanScraper._memory_cache.stats(),
+        'single_flight': DoubanScraper._inflight.stats(),
+        'search_stream': stream_stats.stats(),
+        'subject_revalidation': DoubanScraper._revalidation.stats(),
+        'negative_cache': DoubanScraper._negative_cache.stats(),
+        'refresh_pool': DoubanScraper._refresh_pool.stats(),
+        'douban_rate_limit': douban_rate_limiters.stats(),
+        'circuit_breakers': breaker_stats(),
+        'logging': logging_stats()
+    }
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """运行时统计（连接池复用、缓存命中等）"""
+    return jsonify({
+        'success': True,
+        'data': collect_stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 指标：分阶段耗时直方图、请求耗时直方图和运行时统计"""
+    return Response(
+        metrics.render_prometheus(collect_stats(), STATS_LABEL_KEYS),
+        mimetype='text/plain; version=0.0.4'
+    )
+
 @app.route('/MP_verify_<path:filename>')
 def wechat_verify(filename):
     """微信域名验证文件"""
@@ -67,22 +145,20 @@ def wechat_verify(filename):
 def recognize_book():
     """识别书籍信息"""
     try:
-        logger.info(f"收到图片识别请求 - Content-Type: {request.content_type}")
-        logger.info(f"请求文件: {list(request.files.keys())}")
+        logger.info("收到图片识别请求 - Content-Type: %s", request.content_type)
+        logger.debug("请求文件: %s", list(request.files.keys()))
 
         # 检查请求
         has_image_file = 'image' in request.files
         has_base64 = False
+        json_data = None
 
-        # 安全地检查JSON数据
-        try:
-            has_base64 = request.is_json and request.json and 'imageBase64' in request.json
-        except Exception as e:
-            # 如果不是JSON请求，忽略错误
-            logger.debug(f"JSON检查失败（正常）: {e}")
-            pass
+        # 安全地检查JSON数据（不缓存原始请求体，解析后只保留一份base64字符串）
+        if request.is_json:
+            json_data = request.get_json(silent=True, cache=False)
+            has_base64 = isinstance(json_data, dict) and 'imageBase64' in json_data
 
-        logger.info(f"has_image_file: {has_image_file}, has_base64: {has_base64}")
+        logger.debug("has_image_file: %s, has_base64: %s", has_image_file, has_base64)
 
         if not has_image_file and not has_base64:
             return jsonify({
@@ -94,9 +170,8 @@ def recognize_book():
         api_key = os.getenv('GROK_API_KEY')
         use_ai = bool(api_key)
 
-        # 处理图片
-        image_path = None
-        temp_file = None
+        # 处理图片：全程在内存中，上传的字节或客户端的base64直接进入VLM请求体
+        image = None
 
         if 'image' in request.files:
             # 处理文件上传
@@ -107,41 +182,36 @@ def recognize_book():
                     'error': '没有选择文件'
                 }), 400
 
-            # 保存临时文件
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            file.save(temp_file.name)
-            image_path = temp_file.name
+            image = {'image_bytes': file.read()}
 
         elif has_base64:
-            # 处理base64图片
+            # 处理base64图片：只校验，不解码
             try:
-                image_data = base64.b64decode(request.json['imageBase64'])
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-                temp_file.write(image_data)
-                temp_file.close()
-                image_path = temp_file.name
-            except Exception as e:
+                image_base64, _ = normalize_base64_image(json_data['imageBase64'])
+                image = {'image_base64': image_base64}
+            except ValueError as e:
                 return jsonify({
                     'success': False,
                     'error': f'base64解码失败: {str(e)}'
                 }), 400
+            # 释放原始字符串，等待VLM期间只保留一份base64字节
+            json_data = None
 
         # 识别书籍信息
         book_info = {}
 
-        if use_ai and image_path:
+        if use_ai and image:
             try:
                 extractor = BookInfoExtractor(api_key)
-                book_info = extractor.extract_book_info(image_path)
-                logger.info(f"AI识别结果: {book_info}")
+                book_info = extractor.extract_book_info(**image)
+                logger.info("AI识别结果: %s", book_info, extra=DETAIL)
             except Exception as e:
-                logger.error(f"AI识别失败: {str(e)}")
+                logger.error("AI识别失败: %s", e)
                 # AI失败时，返回空的书籍信息，让用户手动输入
                 book_info = {}
 
-        # 清理临时文件
-        if temp_file and os.path.exists(temp_file.name):
-            os.unlink(temp_file.name)
+        # 图片数据不再需要，后续豆瓣搜索期间不占用内存
+        image = None
 
         # 搜索图书信息
         book_detail_info = None
@@ -154,21 +224,24 @@ def recognize_book():
                     author=book_info.get('author'),
                     publisher=book_info.get('publisher')
                 )
-                logger.info(f"豆瓣搜索结果: {book_detail_info}")
+                if book_detail_info:
+                    book_detail_info.pop('_cache', None)
+                logger.info("豆瓣搜索结果: %s", book_detail_info, extra=DETAIL)
             except Exception as e:
-                logger.error(f"豆瓣搜索失败: {str(e)}")
+                logger.error("豆瓣搜索失败: %s", e)
 
             # 如果豆瓣搜索失败，使用备用API
             if not book_detail_info:
                 try:
                     book_api = BookAPI()
-                    book_detail_info = book_api.search_book(
-                        title=book_info['title'],
-                        author=book_info.get('author')
-                    )
-                    logger.info(f"备用API搜索结果: {book_detail_info}")
+                    with metrics.stage('book_api'):
+                        book_detail_info = book_api.search_book(
+                            title=book_info['title'],
+                            author=book_info.get('author')
+                        )
+                    logger.info("备用API搜索结果: %s", book_detail_info, extra=DETAIL)
                 except Exception as e:
-                    logger.error(f"备用API搜索失败: {str(e)}")
+                    logger.error("备用API搜索失败: %s", e)
 
         return jsonify({
             'success': True,
@@ -180,7 +253,7 @@ def recognize_book():
         })
 
     except Exception as e:
-        logger.error(f"识别书籍信息失败: {str(e)}")
+        logger.error("识别书籍信息失败: %s", e)
         return jsonify({
             'success': False,
             'error': f'服务器错误: {str(e)}'
@@ -202,7 +275,7 @@ def search_douban():
             }), 400
 
         title = data['title']
-        logger.info(f"📖 书名: {title}")
+        logger.info("📖 书名: %s", title)
 
         # 首先尝试豆瓣搜索
         book_info = None
@@ -221,11 +294,11 @@ def search_douban():
                 include_comments=include_comments
             )
             douban_time = (time.time() - douban_start) * 1000
-            logger.info(f"✅ 豆瓣搜索完成: {douban_time:.2f}ms")
-            logger.info(f"📊 搜索结果: {book_info}")
+            logger.info("✅ 豆瓣搜索完成: %.2fms", douban_time)
+            logger.info("📊 搜索结果: %s", book_info, extra=DETAIL)
         except Exception as e:
             douban_time = (time.time() - douban_start) * 1000
-            logger.error(f"❌ 豆瓣搜索失败 ({douban_time:.2f}ms): {str(e)}")
+            logger.error("❌ 豆瓣搜索失败 (%.2fms): %s", douban_time, e)
 
         # 如果豆瓣搜索失败，使用备用API
         if not book_info:
@@ -233,38 +306,204 @@ def search_douban():
             try:
                 logger.info("⏱️  [2/2] 使用备用API搜索...")
                 book_api = BookAPI()
-                book_info = book_api.search_book(
-                    title=data['title'],
-                    author=data.get('author')
-                )
+                with metrics.stage('book_api'):
+                    book_info = book_api.search_book(
+                        title=data['title'],
+                        author=data.get('author')
+                    )
                 backup_time = (time.time() - backup_start) * 1000
-                logger.info(f"✅ 备用API搜索完成: {backup_time:.2f}ms")
-                logger.info(f"📊 备用API结果: {book_info}")
+                logger.info("✅ 备用API搜索完成: %.2fms", backup_time)
+                logger.info("📊 备用API结果: %s", book_info, extra=DETAIL)
             except Exception as e:
                 backup_time = (time.time() - backup_start) * 1000
-                logger.error(f"❌ 备用API失败 ({backup_time:.2f}ms): {str(e)}")
+                logger.error("❌ 备用API失败 (%.2fms): %s", backup_time, e)
 
         total_time = (time.time() - request_start) * 1000
-        logger.info(f"⏰ 总耗时: {total_time:.2f}ms")
+        logger.info("⏰ 总耗时: %.2fms", total_time)
         logger.info("=" * 60)
 
+        debug_info = {
+            'total_time_ms': round(total_time, 2),
+            'stages_ms': metrics.current_timings().as_dict()
+        }
+        # 缓存状态（如过期缓存）放到调试信息中，不混入书籍数据
+        if book_info and '_cache' in book_info:
+            debug_info['cache'] = book_info.pop('_cache')
+
         return jsonify({
             'success': True,
             'data': book_info,
-            '_debug': {
-                'total_time_ms': round(total_time, 2)
-            }
+            '_debug': debug_info
         })
 
     except Exception as e:
         total_time = (time.time() - request_start) * 1000
-        logger.error(f"❌ 搜索失败 ({total_time:.2f}ms): {str(e)}")
+        logger.error("❌ 搜索失败 (%.2fms): %s", total_time, e)
         logger.info("=" * 60)
         return jsonify({
             'success': False,
             'error': f'搜索失败: {str(e)}'
         }), 500
 
+@app.route('/api/search-douban/batch', methods=['POST'])
+def search_douban_batch():
+    """
+    批量搜索图书信息，以NDJSON按完成顺序流式返回
+
+    Request JSON:
+    {
+        "items": [{"title": "活着", "author": "余华", "publisher": "..."}, ...],
+        "include_comments": false,  // 可选
+        "concurrency": 4  // 可选，访问豆瓣的并发数，不超过服务端上限
+    }
+
+    每行一个JSON: {"index": 0, "success": true, "cached": true, "data": {...}}
+    缓存命中的条目立即返回，未命中的条目按并发上限访问豆瓣。
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            'success': False,
+            'error': '请提供书籍列表'
+        }), 400
+
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({
+            'success': False,
+            'error': f'单次最多{BATCH_MAX_ITEMS}本'
+        }), 400
+
+    include_comments = data.get('include_comments', False)
+    try:
+        concurrency = max(1, min(int(data.get('concurrency', BATCH_CONCURRENCY)), BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        concurrency = BATCH_CONCURRENCY
+
+    scraper = DoubanScraper()
+    logger.info("📚 批量搜索: %s本, 并发%s", len(items), concurrency)
+    # 请求上下文（分阶段耗时、日志采样），每个搜索线程在它的副本中执行
+    request_context = contextvars.copy_context()
+
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + '\n'
+
+    def resolve(item):
+        """未命中缓存的条目：豆瓣搜索，失败时使用备用API"""
+        book_info = scraper.search_book(
+            title=item['title'],
+            author=item.get('author'),
+            publisher=item.get('publisher'),
+            include_comments=include_comments
+        )
+        if not book_info:
+            book_info = BookAPI().search_book(title=item['title'], author=item.get('author'))
+        if book_info:
+            book_info.pop('_cache', None)
+        return book_info
+
+    def generate():
+        batch_start = time.time()
+        misses = []
+
+        # 第一轮：缓存命中立即返回
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('title'):
+                yield line({'index': index, 'success': False, 'error': '请提供书名'})
+                continue
+
+            try:
+                cached = scraper.lookup_cached(item['title'], item.get('author'), item.get('publisher'))
+            except Exception as e:
+                logger.error("❌ 批量缓存查询失败: %s", e)
+                cached = None
+
+            if cached and not (include_comments and cached.get('url') and not cached.get('short_comments')):
+                cached.pop('_cache', None)
+                yield line({'index': index, 'success': True, 'cached': True, 'data': cached})
+            else:
+                misses.append((index, item))
+
+        # 第二轮：未命中的条目限制并发访问豆瓣，按完成顺序返回
+        if misses:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-search')
+            try:
+                futures = {
+                    executor.submit(request_context.copy().run, resolve, item): index for index, item in misses
+                }
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        yield line({'index': index, 'success': True, 'cached': False, 'data': future.result()})
+                    except Exception as e:
+                        logger.error("❌ 批量搜索失败: %s", e)
+                        yield line({'index': index, 'success': False, 'error': f'搜索失败: {str(e)}'})
+            finally:
+                # 客户端断开时取消尚未开始的搜索
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        total_time = (time.time() - batch_start) * 1000
+        logger.info("⏰ 批量搜索完成: %s本, 未命中%s本, %.2fms", len(items), len(misses), total_time)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/lookup-isbn', methods=['POST'])
+def lookup_isbn():
+    """
+    按ISBN查询图书信息（直接定位豆瓣详情页，无需解析搜索页）
+
+    Request JSON:
+    {
+        "isbn": "9787506365437",  // 10位或13位ISBN，可带连字符
+        "include_comments": false  // 可选
+    }
+    """
+    request_start = time.time()
+
+    try:
+        data = request.get_json(silent=True)
+        isbn = DoubanScraper._normalize_isbn(data.get('isbn')) if isinstance(data, dict) else None
+        if not isbn:
+            return jsonify({
+                'success': False,
+                'error': '请提供有效的ISBN'
+            }), 400
+
+        logger.info("📘 ISBN: %s", isbn)
+
+        book_info = None
+        try:
+            scraper = DoubanScraper()
+            book_info = scraper.lookup_isbn(isbn, include_comments=data.get('include_comments', False))
+        except Exception as e:
+            logger.error("❌ 豆瓣ISBN查询失败: %s", e)
+
+        # 如果豆瓣查询失败，使用备用API
+        if not book_info:
+            try:
+                with metrics.stage('book_api'):
+                    book_info = BookAPI().search_by_isbn(isbn)
+            except Exception as e:
+                logger.error("❌ 备用API ISBN查询失败: %s", e)
+
+        total_time = (time.time() - request_start) * 1000
+        logger.info("⏰ ISBN查询总耗时: %.2fms", total_time)
+
+        return jsonify({
+            'success': True,
+            'data': book_info,
+            '_debug': {
+                'total_time_ms': round(total_time, 2)
+            }
+        })
+
+    except Exception as e:
+        logger.error("❌ ISBN查询失败: %s", e)
+        return jsonify({
+            'success': False,
+            'error': f'ISBN查询失败: {str(e)}'
+        }), 500
+
 @app.route('/api/get-comments', methods=['POST'])
 def get_comments():
     """
@@ -291,7 +530,7 @@ def get_comments():
         scraper = DoubanScraper()
         comments = scraper._get_short_comments(book_url, limit=limit)
 
-        logger.info(f"获取短评成功: {len(comments)}条")
+        logger.info("获取短评成功: %s条", len(comments))
 
         return jsonify({
             'success': True,
@@ -302,7 +541,7 @@ def get_comments():
         })
 
     except Exception as e:
-        logger.error(f"获取短评失败: {e}")
+        logger.error("获取短评失败: %s", e)
         return jsonify({
             'success': False,
             'error': f'获取短评失败: {str(e)}'
@@ -312,7 +551,7 @@ if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_ENV') == 'development'
 
-    logger.info(f"启动API服务，端口: {port}")
-    logger.info(f"Grok API: {'已配置' if os.getenv('GROK_API_KEY') else '未配置'}")
+    logger.info("启动API服务，端口: %s", port)
+    logger.info("Grok API: %s", '已配置' if os.getenv('GROK_API_KEY') else '未配置')
 
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+连接池基准测试：重复调用 /api/search-douban，对比
+- cold: 每次请求前关闭连接池（模拟每请求新建Session，需重新TCP+TLS握手）
+- pooled: 进程级连接池复用keep-alive连接
+
+用法:
+    python benchmarks/bench_http_pool.py --rounds 10 --title 活着
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_server import app  # noqa: E402
+from douban_scraper import DoubanScraper  # noqa: E402
+from http_client import default_registry  # noqa: E402
+
+
+def reset_cache():
+    """清空缓存，确保每次都真实访问上游"""
+    DoubanScraper._memory_cache.clear()
+    DoubanScraper._negative_cache.clear()
+    DoubanScraper._cache_dir = Path(tempfile.mkdtemp(prefix='bench_douban_cache_'))
+    DoubanScraper._cache_store = None
+
+
+def pool_totals() -> tuple:
+    hosts = default_registry.stats()['hosts'].values()
+    return sum(h['requests'] for h in hosts), sum(h['new_connections'] for h in hosts)
+
+
+def run(mode: str, rounds: int, title: str) -> dict:
+    client = app.test_client()
+    default_registry.close()
+    timings = []
+    upstream_requests = 0
+    new_connections = 0
+
+    for _ in range(rounds):
+        reset_cache()
+        if mode == 'cold':
+            # 关闭前先累计本轮统计
+            requests_count, connections = pool_totals()
+            upstream_requests += requests_count
+            new_connections += connections
+            default_registry.close()
+
+        start = time.perf_counter()
+        response = client.post('/api/search-douban', json={'title': title})
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            print(f"  ⚠️  请求失败: {response.status_code}")
+
+    requests_count, connections = pool_totals()
+    return {
+        'mode': mode,
+        'p50_ms': statistics.median(timings),
+        'mean_ms': statistics.mean(timings),
+        'new_connections': new_connections + connections,
+        'requests': upstream_requests + requests_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP连接池基准测试')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--title', default='活着')
+    args = parser.parse_args()
+
+    results = [run('cold', args.rounds, args.title), run('pooled', args.rounds, args.title)]
+
+    print(f"{'模式':<8}{'p50(ms)':>10}{'平均(ms)':>10}{'上游请求':>10}{'新建连接':>10}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['p50_ms']:>10.1f}{r['mean_ms']:>10.1f}{r['requests']:>10}{r['new_connections']:>10}")
+    cold, pooled = results
+    print(f"\n平均每次请求节省: {cold['mean_ms'] - pooled['mean_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
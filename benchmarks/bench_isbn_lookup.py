@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+ISBN查询与书名搜索的延迟对比：冷缓存下分别调用
+/api/search-douban（书名）和 /api/lookup-isbn（ISBN）
+
+用法:
+    python benchmarks/bench_isbn_lookup.py --title 活着 --isbn 9787506365437 --rounds 5
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_server import app  # noqa: E402
+from douban_scraper import DoubanScraper  # noqa: E402
+
+
+def reset_cache():
+    """清空缓存，确保每次都真实访问上游"""
+    DoubanScraper._memory_cache.clear()
+    DoubanScraper._negative_cache.clear()
+    DoubanScraper._cache_dir = Path(tempfile.mkdtemp(prefix='bench_douban_cache_'))
+    DoubanScraper._cache_store = None
+
+
+def measure(path: str, payload: dict, rounds: int) -> list:
+    client = app.test_client()
+    timings = []
+    for _ in range(rounds):
+        reset_cache()
+        start = time.perf_counter()
+        response = client.post(path, json=payload)
+        timings.append((time.perf_counter() - start) * 1000)
+        data = response.get_json() or {}
+        if not data.get('data'):
+            print(f"  ⚠️  {path} 未返回结果")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ISBN查询与书名搜索延迟对比')
+    parser.add_argument('--title', default='活着')
+    parser.add_argument('--isbn', default='9787506365437')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    routes = [
+        ('书名搜索', '/api/search-douban', {'title': args.title}),
+        ('ISBN查询', '/api/lookup-isbn', {'isbn': args.isbn}),
+    ]
+
+    print(f"{'路径':<10}{'p50(ms)':>10}{'平均(ms)':>10}{'最大(ms)':>10}")
+    for name, path, payload in routes:
+        timings = measure(path, payload, args.rounds)
+        print(f"{name:<10}{statistics.median(timings):>10.1f}{statistics.mean(timings):>10.1f}{max(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
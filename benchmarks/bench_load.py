@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+服务模式压测：对比 `python api_server.py`（Flask 线程模式）与
+`gunicorn -c gunicorn.conf.py`（gevent 协作式I/O）在上游慢响应下的并发能力。
+
+上游请求经 HTTP_UPSTREAM_OVERRIDE 改发到本地回放服务，每个上游响应固定延迟 --latency 秒。
+每个请求使用录制的书名和不同的作者（缓存键不同），都会真实等待豆瓣搜索；
+搜索超时返回的兜底结果单独计为"降级"，不计入吞吐和延迟。
+每个服务模式都只用一个进程，比较的是单进程能同时挂起多少个上游等待。
+
+用法:
+    python benchmarks/bench_load.py --concurrency 50,200,1000 --latency 1.0
+    python benchmarks/bench_load.py --modes gevent --concurrency 2000 --requests 4000
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from bench_suite import percentile
+from fixtures import FixtureStore, StubServer
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+DEFAULT_FIXTURES = BENCH_DIR / 'fixtures' / 'douban'
+
+MODES = {
+    # 与 api_server.py 的 __main__ 相同：werkzeug 线程模式
+    'flask': lambda port: [sys.executable, 'api_server.py'],
+    # 生产配置：单进程 gevent worker
+    'gevent': lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server:app'],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, port: int, upstream: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': '1',
+        'HTTP_UPSTREAM_OVERRIDE': upstream,
+        'FLASK_ENV': 'production',
+        'LOG_LEVEL': 'WARNING',
+        'BOOK_CATALOG_PATH': '',
+    })
+    # 只测服务模式本身：放开豆瓣出站限速
+    for name in ('DOUBAN_RATE_LIMIT', 'DOUBAN_RATE_BURST', 'DOUBAN_RATE_MAX'):
+        env.setdefault(name, '100000')
+
+    process = subprocess.Popen(MODES[mode](port), cwd=ROOT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} 服务启动失败（退出码 {process.returncode}）")
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/health', timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{mode} 服务启动超时")
+
+
+def run_level(port: int, titles, concurrency: int, total: int, timeout: float) -> dict:
+    """concurrency 个客户端线程共发出 total 个请求，每个请求的缓存键都不同"""
+    url = f'http://127.0.0.1:{port}/api/search-douban'
+    run_id = uuid.uuid4().hex[:8]
+
+    def one(i: int):
+        """返回 (耗时ms, 结果: ok / degraded / error)"""
+        payload = {'title': titles[i % len(titles)], 'author': f'压测{run_id}-{i}'}
+        start = time.perf_counter()
+        try:
+            response = requests.post(url, json=payload, timeout=timeout)
+            body = response.json() if response.status_code == 200 else {}
+        except (requests.RequestException, ValueError):
+            body = {}
+        elapsed = (time.perf_counter() - start) * 1000
+        if not body.get('success'):
+            return elapsed, 'error'
+        return elapsed, 'degraded' if (body.get('data') or {}).get('source') == 'fallback' else 'ok'
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [ms for ms, outcome in results if outcome == 'ok']
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'degraded': sum(1 for _, outcome in results if outcome == 'degraded'),
+        'errors': sum(1 for _, outcome in results if outcome == 'error'),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50': round(percentile(latencies, 50), 1) if latencies else None,
+        'p95': round(percentile(latencies, 95), 1) if latencies else None,
+        'p99': round(percentile(latencies, 99), 1) if latencies else None,
+        'mean': round(statistics.mean(latencies), 1) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务模式压测')
+    parser.add_argument('--modes', default='flask,gevent', help=f"逗号分隔: {', '.join(MODES)}")
+    parser.add_argument('--concurrency', default='50,200,1000', help='逗号分隔的并发客户端数')
+    parser.add_argument('--requests', type=int, help='每个并发级别的请求总数（默认等于并发数的2倍）')
+    parser.add_argument('--latency', type=float, default=1.0, help='上游响应延迟（秒）')
+    parser.add_argument('--timeout', type=float, default=60, help='客户端超时（秒）')
+    parser.add_argument('--fixtures', default=str(DEFAULT_FIXTURES), help='录制目录')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"未知的服务模式: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    store = FixtureStore(Path(args.fixtures))
+    titles = store.index['titles']
+    if not titles:
+        parser.error(f"录制目录中没有书名: {args.fixtures}")
+
+    stub = StubServer(store, latency=args.latency).start()
+    print(f"🎭 回放服务 {stub.base_url}  上游延迟 {args.latency * 1000:.0f}ms\n")
+
+    print(f"{'模式':<8}{'并发':>6}{'请求':>7}{'降级':>6}{'失败':>6}{'吞吐/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    try:
+        for mode in modes:
+            port = free_port()
+            process = start_server(mode, port, stub.base_url)
+            try:
+                for level in levels:
+                    result = run_level(port, titles, level, args.requests or level * 2, args.timeout)
+                    print(f"{mode:<8}{level:>6}{result['requests']:>7}{result['degraded']:>6}{result['errors']:>6}"
+                          f"{result['throughput']:>9.1f}"
+                          + ''.join(f"{result[key]:>9.1f}" if result[key] is not None else f"{'-':>9}"
+                                    for key in ('p50', 'p95', 'p99')))
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    finally:
+        stub.stop()
+
+    print(f"\n回放统计: {stub.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+搜索策略竞速基准：用可控延迟替换两个搜索策略，验证 search_book
+的总耗时跟随较快的策略，而不是等待较慢的策略结束。
+
+用法:
+    python benchmarks/bench_search_race.py --fast 0.2 --slow 2.0
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from douban_scraper import DoubanScraper  # noqa: E402
+
+
+def make_strategy(delay: float, source: str):
+    def strategy(self, title, author=None, cancel_event=None):
+        # 模拟网络等待，收到取消信号时提前退出
+        if cancel_event is not None and cancel_event.wait(delay):
+            return None
+        if cancel_event is None:
+            time.sleep(delay)
+        # 评分、作者、出版社齐全，不会触发详情页补全（否则会真实访问豆瓣）
+        return {
+            'title': title,
+            'author': author or '测试作者',
+            'publisher': '测试出版社',
+            'rating': 8.0,
+            'url': 'https://book.douban.com/subject/1/',
+            'source': source
+        }
+    return strategy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索策略竞速基准')
+    parser.add_argument('--fast', type=float, default=0.2, help='较快策略耗时（秒）')
+    parser.add_argument('--slow', type=float, default=2.0, help='较慢策略耗时（秒）')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    DoubanScraper._cache_dir = Path(tempfile.mkdtemp(prefix='bench_douban_cache_'))
+    DoubanScraper._search_douban_web = make_strategy(args.slow, 'douban')
+    DoubanScraper._search_douban_book = make_strategy(args.fast, 'douban_book')
+
+    scraper = DoubanScraper()
+    worst = 0.0
+    for i in range(args.rounds):
+        DoubanScraper._memory_cache.clear()
+        start = time.perf_counter()
+        result = scraper.search_book(f"竞速测试{i}")
+        elapsed = time.perf_counter() - start
+        worst = max(worst, elapsed)
+        print(f"第{i + 1}轮: {elapsed * 1000:.1f}ms 胜出策略={result['source']}")
+
+    print(f"\n较快策略: {args.fast * 1000:.0f}ms  较慢策略: {args.slow * 1000:.0f}ms  最慢一轮: {worst * 1000:.1f}ms")
+    if worst < args.slow:
+        print("✅ 总耗时跟随较快策略")
+    else:
+        print("❌ 总耗时被较慢策略拖慢")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+搜索页流式提前停止基准：本地HTTP服务按限定带宽回放录制的豆瓣搜索页，
+对比完整下载后解析与流式读取到前3个结果即停止两种方式的
+读取字节数、首个候选耗时、解析耗时、总耗时和新建连接数
+（流式提前停止后剩余部分超过 DOUBAN_STREAM_DRAIN_BYTES 时连接被关闭，下一轮需重新建连）。
+
+用法:
+    python benchmarks/bench_stream_search.py saved/web_search.html --title 活着 --kbps 500
+    python benchmarks/bench_stream_search.py             # 不指定页面时生成合成页面
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from douban_scraper import DoubanScraper  # noqa: E402
+from http_client import default_registry  # noqa: E402
+from html_parser import (  # noqa: E402
+    parse_html, read_until_results, WEB_RESULT_STRAINER, WEB_RESULT_CONTAINERS
+)
+
+RESULT_TEMPLATE = (
+    '<div class="result"><div class="pic"><a class="nbg" href="https://www.douban.com/link2/?url='
+    'https%3A%2F%2Fbook.douban.com%2Fsubject%2F{id}%2F&amp;query=x"><img src="x.jpg"></a></div>'
+    '<div class="content"><div class="title"><h3><span>[书籍]</span>&nbsp;<a href="https://www.douban.com/link2/'
+    '?url=https%3A%2F%2Fbook.douban.com%2Fsubject%2F{id}%2F&amp;query=x" target="_blank">{title}</a></h3>'
+    '<div class="rating-info"><span class="rating_nums">8.{i}</span><span>(1234人评价)</span>'
+    '<span class="subject-cast">作者{i} / 出版社{i} / 2012</span></div></div><p>{intro}</p></div></div>\n'
+)
+
+
+def synthetic_page(results: int, padding_kb: int) -> bytes:
+    """生成结构与豆瓣搜索页一致的页面：results 个结果 + 页尾填充（侧栏、脚本等）"""
+    body = ''.join(
+        RESULT_TEMPLATE.format(id=1000 + i, i=i % 10, title=f'测试书名{i}', intro='简介' * 100)
+        for i in range(results)
+    )
+    padding = '<div class="aside">' + '<p>侧栏推荐内容</p>' * (padding_kb * 1024 // 40) + '</div>'
+    return f'<html><head><title>搜索</title></head><body><div class="search-result">{body}</div>{padding}</body></html>'.encode('utf-8')
+
+
+def make_handler(pages, kbps: float):
+    chunk = 4096
+    delay = chunk / (kbps * 1024) if kbps > 0 else 0
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = pages[int(self.path.strip('/'))]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                for offset in range(0, len(body), chunk):
+                    self.wfile.write(body[offset:offset + chunk])
+                    self.wfile.flush()
+                    if delay:
+                        time.sleep(delay)
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端拿到足够结果后提前关闭连接
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 流式读取提前关闭连接是预期行为
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def run_full(scraper, url: str, title: str):
+    start = time.perf_counter()
+    response = scraper.session.get(url, timeout=30)
+    html = response.text
+    downloaded = time.perf_counter()
+    book_info = scraper._best_web_candidate(parse_html(html, only=WEB_RESULT_STRAINER), title)
+    end = time.perf_counter()
+    return {
+        'bytes': len(response.content),
+        'first_candidate_ms': (downloaded - start) * 1000,
+        'parse_ms': (end - downloaded) * 1000,
+        'total_ms': (end - start) * 1000,
+        'found': bool(book_info)
+    }
+
+
+def run_stream(scraper, url: str, title: str):
+    start = time.perf_counter()
+    response = scraper.session.get(url, timeout=30, stream=True)
+    headers_ms = (time.perf_counter() - start) * 1000
+    page = read_until_results(response, WEB_RESULT_CONTAINERS, limit=3)
+    page.release()
+    parse_start = time.perf_counter()
+    book_info = scraper._best_web_candidate(parse_html(page.text, only=WEB_RESULT_STRAINER), title)
+    end = time.perf_counter()
+    return {
+        'bytes': len(page.content),
+        'first_candidate_ms': headers_ms + (page.first_candidate_ms or 0.0),
+        'parse_ms': (end - parse_start) * 1000,
+        'total_ms': (end - start) * 1000,
+        'found': bool(book_info)
+    }
+
+
+def total_connects() -> int:
+    return sum(h['new_connections'] for h in default_registry.stats()['hosts'].values())
+
+
+def measure(run, scraper, url: str, title: str, rounds: int):
+    """运行 rounds 轮，返回 (每轮结果, 新建连接数)"""
+    before = total_connects()
+    runs = [run(scraper, url, title) for _ in range(rounds)]
+    return runs, total_connects() - before
+
+
+def summarize(name: str, runs, connects: int):
+    print(f"  {name:<8} 字节 {statistics.mean(r['bytes'] for r in runs):>9.0f}  "
+          f"首个候选 {statistics.median(r['first_candidate_ms'] for r in runs):>7.1f}ms  "
+          f"解析 {statistics.median(r['parse_ms'] for r in runs):>6.1f}ms  "
+          f"总耗时 p50 {statistics.median(r['total_ms'] for r in runs):>7.1f}ms  "
+          f"命中 {sum(r['found'] for r in runs)}/{len(runs)}  新建连接 {connects}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索页流式提前停止基准')
+    parser.add_argument('pages', nargs='*', help='录制的豆瓣搜索页HTML文件')
+    parser.add_argument('--title', help='要查找的书名（默认使用合成页面的第一个结果）')
+    parser.add_argument('--results', type=int, default=20, help='合成页面的结果数')
+    parser.add_argument('--padding-kb', type=int, default=150, help='合成页面结果之后的填充大小（KB）')
+    parser.add_argument('--kbps', type=float, default=1000, help='回放带宽（KB/s，0为不限速）')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = [Path(p).read_bytes() for p in args.pages]
+        names = [Path(p).name for p in args.pages]
+        title = args.title
+        if not title:
+            parser.error('录制页面需要指定 --title')
+    else:
+        pages = [synthetic_page(args.results, args.padding_kb)]
+        names = ['synthetic']
+        title = args.title or '测试书名0'
+
+    server = QuietHTTPServer(('127.0.0.1', 0), make_handler(pages, args.kbps))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    scraper = DoubanScraper()
+
+    print(f"带宽 {args.kbps:.0f}KB/s，每种方式 {args.rounds} 轮，查找《{title}》")
+    for index, (name, body) in enumerate(zip(names, pages)):
+        url = f"{base}/{index}"
+        print(f"\n📄 {name} ({len(body)} 字节)")
+        full, full_connects = measure(run_full, scraper, url, title, args.rounds)
+        stream, stream_connects = measure(run_stream, scraper, url, title, args.rounds)
+        summarize('完整下载', full, full_connects)
+        summarize('流式', stream, stream_connects)
+        saved = 1 - statistics.mean(r['bytes'] for r in stream) / statistics.mean(r['bytes'] for r in full)
+        print(f"  节省字节 {saved:.0%}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
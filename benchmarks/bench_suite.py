@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+离线基准套件：启动本地回放服务（录制目录见 capture_fixtures.py），
+所有上游请求经 HTTP_UPSTREAM_OVERRIDE 改发到回放服务，在冷缓存下测量
+DoubanScraper.search_book、_get_short_comments、BookAPI.search_book 和 Flask 接口的
+p50/p95/p99，并与保存的基线对比。
+
+用法:
+    python benchmarks/bench_suite.py --rounds 20 --latency 0.05 --jitter 0.02
+    python benchmarks/bench_suite.py --save-baseline          # 保存为新基线
+    python benchmarks/bench_suite.py --error-rate 0.1         # 上游错误注入
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import FixtureStore, StubServer  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_FIXTURES = BENCH_DIR / 'fixtures' / 'douban'
+DEFAULT_BASELINE = BENCH_DIR / 'baseline.json'
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(timings) -> dict:
+    return {
+        'count': len(timings),
+        'mean': round(statistics.mean(timings), 2),
+        'p50': round(percentile(timings, 50), 2),
+        'p95': round(percentile(timings, 95), 2),
+        'p99': round(percentile(timings, 99), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线基准套件')
+    parser.add_argument('--fixtures', default=str(DEFAULT_FIXTURES), help='录制目录')
+    parser.add_argument('--rounds', type=int, default=20, help='每个场景的执行次数')
+    parser.add_argument('--latency', type=float, default=0.0, help='回放基础延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='回放随机抖动上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回放错误注入概率')
+    parser.add_argument('--seed', type=int, default=42, help='抖动和错误注入的随机种子')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='p95 超过基线该比例视为回退（退出码1）')
+    args = parser.parse_args()
+
+    store = FixtureStore(Path(args.fixtures))
+    titles = store.index['titles']
+    subject_urls = store.index['subject_urls']
+    isbns = store.index['isbns']
+    if not titles:
+        parser.error(f"录制目录中没有书名: {args.fixtures}")
+
+    stub = StubServer(store, latency=args.latency, jitter=args.jitter,
+                      error_rate=args.error_rate, seed=args.seed).start()
+
+    # 必须在导入项目模块之前设置：连接池和限速器在导入时读取配置
+    os.environ['HTTP_UPSTREAM_OVERRIDE'] = stub.base_url
+    for name in ('DOUBAN_RATE_LIMIT', 'DOUBAN_RATE_BURST', 'DOUBAN_RATE_MAX'):
+        os.environ.setdefault(name, '10000')
+    os.environ.setdefault('BOOK_CATALOG_PATH', '')
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    from api_server import app
+    from book_api import BookAPI
+    from douban_scraper import DoubanScraper
+
+    def reset_caches():
+        """每次执行前清空缓存，测量真实访问上游的冷路径"""
+        DoubanScraper._memory_cache.clear()
+        DoubanScraper._negative_cache.clear()
+        DoubanScraper._cache_dir = Path(tempfile.mkdtemp(prefix='bench_suite_cache_'))
+        DoubanScraper._cache_store = None
+
+    client = app.test_client()
+    scenarios = {
+        'scraper.search_book': lambda i: DoubanScraper().search_book(titles[i % len(titles)]),
+        'BookAPI.search_book': lambda i: BookAPI().search_book(titles[i % len(titles)]),
+        'POST /api/search-douban': lambda i: client.post(
+            '/api/search-douban', json={'title': titles[i % len(titles)]}),
+    }
+    if subject_urls:
+        scenarios['scraper._get_short_comments'] = \
+            lambda i: DoubanScraper()._get_short_comments(subject_urls[i % len(subject_urls)])
+        scenarios['POST /api/get-comments'] = lambda i: client.post(
+            '/api/get-comments', json={'url': subject_urls[i % len(subject_urls)]})
+    if isbns:
+        scenarios['POST /api/lookup-isbn'] = lambda i: client.post(
+            '/api/lookup-isbn', json={'isbn': isbns[i % len(isbns)]})
+
+    print(f"🎭 回放服务 {stub.base_url}  延迟 {args.latency * 1000:.0f}ms  "
+          f"抖动 {args.jitter * 1000:.0f}ms  错误率 {args.error_rate:.0%}  每场景 {args.rounds} 次\n")
+
+    results = {}
+    for name, run in scenarios.items():
+        timings = []
+        for i in range(args.rounds):
+            reset_caches()
+            start = time.perf_counter()
+            run(i)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(timings)
+
+    stub.stop()
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')).get('results', {}) \
+        if baseline_path.exists() else {}
+
+    regressions = []
+    print(f"{'场景':<30}{'p50':>9}{'p95':>9}{'p99':>9}   基线p95    变化")
+    for name, summary in results.items():
+        line = f"{name:<30}{summary['p50']:>9.1f}{summary['p95']:>9.1f}{summary['p99']:>9.1f}"
+        base = baseline.get(name)
+        if base and base['p95'] > 0:
+            change = summary['p95'] / base['p95'] - 1
+            line += f"   {base['p95']:>7.1f}  {change:>+6.0%}"
+            if change > args.tolerance:
+                regressions.append(name)
+                line += '  ⚠️'
+        print(line)
+    print(f"\n回放统计: {stub.stats()}")
+
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps({
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'config': {'rounds': args.rounds, 'latency': args.latency, 'jitter': args.jitter,
+                       'error_rate': args.error_rate, 'seed': args.seed},
+            'results': results
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"💾 已保存基线: {baseline_path}")
+    elif regressions:
+        print(f"❌ p95 回退超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+录制真实上游响应：对每个书名分别执行两个豆瓣搜索策略、书籍详情/短评、
+Open Library 和 Google Books 搜索（以及可选的ISBN查询），把所有GET响应写入录制目录，
+供 stub_server.py / bench_suite.py 离线回放。
+
+用法（需要能访问豆瓣）:
+    python benchmarks/capture_fixtures.py 活着 三体 --isbn 9787506365437 --out benchmarks/fixtures/douban
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import FixtureStore, RecordingAdapter  # noqa: E402
+from http_client import default_registry  # noqa: E402
+from douban_scraper import DoubanScraper  # noqa: E402
+from book_api import BookAPI  # noqa: E402
+
+DEFAULT_OUT = Path(__file__).resolve().parent / 'fixtures' / 'douban'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='录制上游响应')
+    parser.add_argument('titles', nargs='+', help='要录制的书名')
+    parser.add_argument('--isbn', action='append', default=[], help='要录制的ISBN（可重复）')
+    parser.add_argument('--out', default=str(DEFAULT_OUT), help='录制目录（已存在时追加）')
+    args = parser.parse_args()
+
+    store = FixtureStore(Path(args.out))
+    default_registry.close()
+    default_registry.adapter_factory = lambda **kwargs: RecordingAdapter(store, **kwargs)
+
+    # 使用空缓存，确保每个页面都真实请求一次
+    DoubanScraper._cache_dir = Path(tempfile.mkdtemp(prefix='capture_douban_cache_'))
+    DoubanScraper._cache_store = None
+    scraper = DoubanScraper()
+    book_api = BookAPI()
+
+    for title in args.titles:
+        print(f"📖 {title}")
+        # 两个策略都单独执行一次，竞速时落后的策略也有录制的页面可回放
+        results = [scraper._search_douban_web(title), scraper._search_douban_book(title)]
+        book = scraper.search_book(title, include_comments=True)
+        for result in results + [book]:
+            if result and scraper._parse_subject_id(result.get('url')):
+                store.add_meta('subject_urls', result['url'])
+        book_api._search_open_library(title)
+        book_api._search_google_books(title)
+        store.add_meta('titles', title)
+        print(f"   -> {book.get('source') if book else None} {book.get('url') if book else ''}")
+
+    for isbn in args.isbn:
+        print(f"🔢 {isbn}")
+        result = scraper.lookup_isbn(isbn)
+        book_api._isbn_open_library(isbn)
+        book_api._isbn_google_books(isbn)
+        store.add_meta('isbns', isbn)
+        print(f"   -> {result.get('url') if result else None}")
+
+    store.save()
+    print(f"\n✅ 已录制 {len(store.index['responses'])} 个响应 -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
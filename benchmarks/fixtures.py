@@ -0,0 +1,210 @@
+"""
+上游响应的录制与回放
+
+录制目录结构:
+    index.json      {"titles": [...], "isbns": [...], "subject_urls": [...], "responses": {"<主机><路径?查询>": {...}}}
+    bodies/<sha1>   响应体（已解压）
+
+- FixtureStore: 读写录制目录
+- RecordingAdapter: 传输适配器，真实请求的同时录制响应（capture_fixtures.py 使用）
+- StubServer: 本地回放服务，可配置延迟、抖动和错误注入（stub_server.py / bench_suite.py 使用），
+  配合 HTTP_UPSTREAM_OVERRIDE 让所有上游请求离线完成
+"""
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+from requests.adapters import HTTPAdapter
+
+# 回放时保留的响应头
+KEPT_HEADERS = ('Content-Type', 'Location', 'ETag', 'Last-Modified')
+
+
+def fixture_key(host: str, path_and_query: str) -> str:
+    return f"{host}{path_and_query}"
+
+
+class FixtureStore:
+    """录制目录的读写（线程安全）"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index = {'titles': [], 'isbns': [], 'subject_urls': [], 'responses': {}}
+        self._lock = threading.Lock()
+        index_file = self.root / 'index.json'
+        if index_file.exists():
+            self.index.update(json.loads(index_file.read_text(encoding='utf-8')))
+
+    def add_response(self, url: str, status: int, headers: Dict, body: bytes):
+        parts = urllib.parse.urlsplit(url)
+        key = fixture_key(parts.netloc, parts.path + (f"?{parts.query}" if parts.query else ''))
+        digest = hashlib.sha1(body).hexdigest()
+        body_file = self.root / 'bodies' / digest
+        with self._lock:
+            body_file.parent.mkdir(parents=True, exist_ok=True)
+            if not body_file.exists():
+                body_file.write_bytes(body)
+            self.index['responses'][key] = {
+                'status': status,
+                'headers': {name: headers[name] for name in KEPT_HEADERS if name in headers},
+                'body': f"bodies/{digest}"
+            }
+
+    def add_meta(self, field: str, value: str):
+        with self._lock:
+            if value not in self.index[field]:
+                self.index[field].append(value)
+
+    def get(self, host: str, path_and_query: str) -> Optional[Dict]:
+        return self.index['responses'].get(fixture_key(host, path_and_query))
+
+    def body(self, entry: Dict) -> bytes:
+        return (self.root / entry['body']).read_bytes()
+
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            (self.root / 'index.json').write_text(
+                json.dumps(self.index, ensure_ascii=False, indent=2), encoding='utf-8'
+            )
+
+
+class RecordingAdapter(HTTPAdapter):
+    """真实发送请求，并把响应（读完整个响应体）写入 FixtureStore"""
+
+    def __init__(self, store: FixtureStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if request.method == 'GET':
+            self.store.add_response(request.url, response.status_code, response.headers, response.content)
+        return response
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 压测时有上千个并发连接，默认的5会导致SYN队列溢出和1秒重传
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # 客户端流式读取提前关闭连接是预期行为
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """
+    本地回放服务
+
+    按 X-Upstream-Host 请求头 + 路径查找录制的响应；未录制的请求返回404。
+    支持 If-None-Match 条件请求（ETag相同时返回304）。
+
+    Args:
+        latency: 每个响应的基础延迟（秒）
+        jitter: 在基础延迟上叠加的随机抖动上限（秒）
+        error_rate: 返回 error_status 的概率
+        seed: 随机种子，固定后抖动和错误注入可复现
+    """
+
+    def __init__(self, store: FixtureStore, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, host: str = '127.0.0.1',
+                 port: int = 0, seed: int = None):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.served = 0
+        self.missing = 0
+        self.injected_errors = 0
+        self._server = _QuietHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self):
+        """返回 (本次延迟, 是否注入错误)"""
+        with self._random_lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            return delay, self._random.random() < self.error_rate
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头和响应体分两次写出，关闭Nagle避免与延迟确认叠加出约40ms的额外等待
+            disable_nagle_algorithm = True
+
+            def _reply(self, status: int, headers: Dict, body: bytes = b''):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+
+            def do_GET(self):
+                delay, inject_error = stub._draw()
+                if delay:
+                    time.sleep(delay)
+
+                if inject_error:
+                    stub.injected_errors += 1
+                    self._reply(stub.error_status, {'Content-Type': 'text/plain'}, b'injected error')
+                    return
+
+                entry = stub.store.get(self.headers.get('X-Upstream-Host', ''), self.path)
+                if entry is None:
+                    stub.missing += 1
+                    self._reply(404, {'Content-Type': 'text/plain'}, b'not recorded')
+                    return
+
+                stub.served += 1
+                etag = entry['headers'].get('ETag')
+                if etag and self.headers.get('If-None-Match') == etag:
+                    self._reply(304, {'ETag': etag})
+                    return
+                self._reply(entry['status'], entry['headers'], stub.store.body(entry))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'StubServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict:
+        return {
+            'served': self.served,
+            'missing': self.missing,
+            'injected_errors': self.injected_errors
+        }
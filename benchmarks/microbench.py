@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+解析与匹配微基准：在录制的HTML语料（capture_fixtures.py 的录制目录）上
+逐个测量解析、提取和书名匹配函数的单次耗时和内存分配，结果追加到历史文件，
+并与上一次记录对比。新的解析器或匹配实现应先在这里对比。
+
+用法:
+    python benchmarks/microbench.py
+    python benchmarks/microbench.py --parser html.parser --no-record   # 对比解析后端
+    python benchmarks/microbench.py --filter match --min-time 0.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import FixtureStore  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_CORPUS = BENCH_DIR / 'fixtures' / 'douban'
+DEFAULT_HISTORY = BENCH_DIR / 'results' / 'microbench_history.jsonl'
+
+
+def load_corpus(store: FixtureStore):
+    """按URL把录制的页面分为 web（豆瓣搜索）、book（豆瓣读书搜索）、subject（详情页）"""
+    pages = {'web': [], 'book': [], 'subject': []}
+    for key, entry in store.index['responses'].items():
+        if entry['status'] != 200:
+            continue
+        if key.startswith('www.douban.com/search'):
+            kind = 'web'
+        elif key.startswith('book.douban.com/subject_search'):
+            kind = 'book'
+        elif key.startswith('book.douban.com/subject/'):
+            kind = 'subject'
+        else:
+            continue
+        pages[kind].append((key, store.body(entry).decode('utf-8', errors='replace')))
+    return pages
+
+
+def build_cases(pages, titles):
+    """生成 (名称, 可调用对象) 列表；解析结果预先构建，提取函数只测量自身"""
+    from douban_scraper import DoubanScraper
+    from html_parser import parse_html, WEB_RESULT_STRAINER, BOOK_RESULT_STRAINER
+    from title_match import is_title_match, title_similarity, rank_candidates
+
+    scraper = DoubanScraper()
+    title = titles[0] if titles else ''
+    cases = []
+
+    for _, html in pages['web']:
+        soup = parse_html(html)
+        candidates = scraper._collect_web_candidates(soup)
+        cases += [
+            ('parse_html[web]', lambda html=html: parse_html(html)),
+            ('parse_html[web,restricted]', lambda html=html: parse_html(html, only=WEB_RESULT_STRAINER)),
+            ('_collect_web_candidates', lambda soup=soup: scraper._collect_web_candidates(soup)),
+            ('_best_web_candidate', lambda soup=soup, html=html: scraper._best_web_candidate(soup, title, html=html)),
+            ('_rank_candidates[web]', lambda candidates=candidates: scraper._rank_candidates(title, candidates)),
+        ]
+        break
+
+    for _, html in pages['book']:
+        soup = parse_html(html, only=BOOK_RESULT_STRAINER)
+        cases += [
+            ('parse_html[book,restricted]', lambda html=html: parse_html(html, only=BOOK_RESULT_STRAINER)),
+            ('_collect_book_candidates', lambda soup=soup: scraper._collect_book_candidates(soup)),
+        ]
+        break
+
+    for key, html in pages['subject']:
+        soup = parse_html(html)
+        url = f"https://{key}"
+        cases += [
+            ('parse_html[subject]', lambda html=html: parse_html(html)),
+            ('_parse_subject_detail', lambda soup=soup, url=url: scraper._parse_subject_detail(soup, url)),
+            ('_parse_short_comments', lambda soup=soup: scraper._parse_short_comments(soup)),
+        ]
+        break
+
+    # 书名匹配（title_match，不依赖页面）：命中 / 不命中 / 相似度，以及N个候选的排序
+    match_title = title or '活着'
+    hit = f'[书籍] {match_title}'
+    miss = f'{match_title}（纪念版）全集第二部'
+    candidates = [
+        {'title': f'{match_title}（第{i}版）' if i % 3 == 0 else f'无关书名{i}', 'author': f'作者{i}'}
+        for i in range(20)
+    ] + [{'title': match_title, 'author': '作者'}]
+    cases += [
+        ('is_title_match[hit]', lambda: is_title_match(match_title, hit)),
+        ('is_title_match[miss]', lambda: is_title_match(match_title, miss)),
+        ('title_similarity', lambda: title_similarity(match_title, miss)),
+        (f'rank_candidates[{len(candidates)}]', lambda: rank_candidates(match_title, candidates, '作者')),
+    ]
+
+    return cases
+
+
+def time_case(fn, min_time: float, repeat: int):
+    """自动确定循环次数使每轮不少于 min_time 秒，返回每次调用的耗时列表（微秒）"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or loops >= 1_000_000:
+            break
+        loops *= 2
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append((time.perf_counter() - start) / loops * 1e6)
+    return runs
+
+
+def measure_allocations(fn):
+    """单次调用的峰值内存（字节）和调用结束后仍存活的新分配内存块数"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'lineno'))
+    return peak - base, blocks
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=BENCH_DIR, timeout=5).stdout.strip()
+    except Exception:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析与匹配微基准')
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS), help='录制目录（HTML语料）')
+    parser.add_argument('--parser', help='HTML解析后端（覆盖 DOUBAN_HTML_PARSER）')
+    parser.add_argument('--filter', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--min-time', type=float, default=0.2, help='每个用例的最短计时（秒）')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--history', default=str(DEFAULT_HISTORY), help='历史记录文件（JSONL）')
+    parser.add_argument('--no-record', action='store_true', help='不写入历史记录')
+    args = parser.parse_args()
+
+    if args.parser:
+        os.environ['DOUBAN_HTML_PARSER'] = args.parser
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    from html_parser import get_parser_backend
+
+    store = FixtureStore(Path(args.corpus))
+    pages = load_corpus(store)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cases = build_cases(pages, store.index['titles'])
+    if args.filter:
+        cases = [(name, fn) for name, fn in cases if args.filter in name]
+    if not cases:
+        parser.error('没有可运行的用例（检查语料目录和 --filter）')
+
+    history_path = Path(args.history)
+    previous = None
+    if history_path.exists():
+        lines = [line for line in history_path.read_text(encoding='utf-8').splitlines() if line.strip()]
+        for line in reversed(lines):
+            entry = json.loads(line)
+            if entry.get('parser') == get_parser_backend():
+                previous = entry['results']
+                break
+
+    print(f"解析后端: {get_parser_backend()}  语料: {sum(len(v) for v in pages.values())} 页\n")
+    print(f"{'用例':<36}{'最快µs':>10}{'中位µs':>10}{'峰值KiB':>10}{'存留块':>8}   对比上次")
+
+    results = {}
+    for name, fn in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs = time_case(fn, args.min_time, args.repeat)
+            peak, blocks = measure_allocations(fn)
+        result = {
+            'best_us': round(min(runs), 2),
+            'median_us': round(statistics.median(runs), 2),
+            'peak_kib': round(peak / 1024, 1),
+            'retained_blocks': blocks
+        }
+        results[name] = result
+
+        line = f"{name:<36}{result['best_us']:>10.1f}{result['median_us']:>10.1f}{result['peak_kib']:>10.1f}{blocks:>8}"
+        if previous and name in previous and previous[name]['best_us'] > 0:
+            line += f"   {result['best_us'] / previous[name]['best_us'] - 1:>+6.1%}"
+        print(line)
+
+    if not args.no_record:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'revision': git_revision(),
+                'parser': get_parser_backend(),
+                'python': sys.version.split()[0],
+                'results': results
+            }, ensure_ascii=False) + '\n')
+        print(f"\n💾 已追加到 {history_path}")
+
+
+if __name__ == "__main__":
+    main()
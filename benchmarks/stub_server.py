@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+独立运行的上游回放服务，配合 HTTP_UPSTREAM_OVERRIDE 让API服务离线访问录制的页面。
+
+用法:
+    python benchmarks/stub_server.py --port 8900 --latency 0.08 --jitter 0.04 --error-rate 0.05
+    HTTP_UPSTREAM_OVERRIDE=http://127.0.0.1:8900 python api_server.py
+"""
+import argparse
+from pathlib import Path
+
+from fixtures import FixtureStore, StubServer
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'douban'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='上游回放服务')
+    parser.add_argument('--fixtures', default=str(DEFAULT_FIXTURES), help='录制目录')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.0, help='基础延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机抖动上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='注入错误的概率')
+    parser.add_argument('--error-status', type=int, default=503, help='注入错误的状态码')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    args = parser.parse_args()
+
+    store = FixtureStore(Path(args.fixtures))
+    stub = StubServer(store, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      error_status=args.error_status, host=args.host, port=args.port, seed=args.seed)
+    print(f"🎭 回放 {len(store.index['responses'])} 个响应: {stub.base_url}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
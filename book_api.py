@@ -1,7 +1,13 @@
-import requests
+import logging
 import urllib.parse
 from typing import Optional, Dict
 
+from book_fields import parse_year
+from http_client import get_client
+from circuit_breaker import get_breaker, is_failure_status
+
+logger = logging.getLogger(__name__)
+
 
 class BookAPI:
     """图书信息API - 使用开放的图书数据源"""
@@ -10,6 +16,23 @@ class BookAPI:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        self.client = get_client(self.headers)
+
+    def _get(self, url: str, breaker: str, **kwargs):
+        """经过熔断器的请求，熔断打开时立即抛出 CircuitOpenError"""
+        circuit = get_breaker(breaker)
+        circuit.check()
+        try:
+            response = self.client.get(url, **kwargs)
+        except Exception:
+            circuit.record_failure()
+            raise
+
+        if is_failure_status(response.status_code):
+            circuit.record_failure()
+        else:
+            circuit.record_success()
+        return response
 
     def search_book(self, title: str, author: str = None) -> Optional[Dict]:
         """搜索图书信息"""
@@ -26,6 +49,76 @@ class BookAPI:
 
         return None
 
+    def search_by_isbn(self, isbn: str) -> Optional[Dict]:
+        """按ISBN查询图书信息"""
+
+        # 优先使用Open Library API
+        result = self._isbn_open_library(isbn)
+        if result:
+            return result
+
+        # 备用：使用Google Books API
+        result = self._isbn_google_books(isbn)
+        if result:
+            return result
+
+        return None
+
+    def _isbn_open_library(self, isbn: str) -> Optional[Dict]:
+        """使用Open Library Books API按ISBN查询"""
+        try:
+            url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{urllib.parse.quote(isbn)}&format=json&jscmd=data"
+
+            response = self._get(url, breaker='open_library', timeout=10)
+            response.raise_for_status()
+
+            book = response.json().get(f"ISBN:{isbn}")
+            if book:
+                return {
+                    'title': book.get('title', ''),
+                    'author': ', '.join(a.get('name', '') for a in book.get('authors', [])),
+                    'publisher': ', '.join(p.get('name', '') for p in book.get('publishers', [])),
+                    'publish_year': parse_year(book.get('publish_date')),
+                    'isbn': isbn,
+                    'rating': None,  # Open Library 没有评分
+                    'url': book.get('url'),
+                    'source': 'Open Library'
+                }
+
+        except Exception as e:
+            logger.warning("Open Library ISBN查询失败: %s", e)
+
+        return None
+
+    def _isbn_google_books(self, isbn: str) -> Optional[Dict]:
+        """使用Google Books API按ISBN查询"""
+        try:
+            url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{urllib.parse.quote(isbn)}&maxResults=1"
+
+            response = self._get(url, breaker='google_books', timeout=10)
+            response.raise_for_status()
+
+            data = response.json()
+
+            if data.get('items'):
+                book = data['items'][0]['volumeInfo']
+
+                return {
+                    'title': book.get('title', ''),
+                    'author': ', '.join(book.get('authors', [])) if book.get('authors') else '',
+                    'publisher': book.get('publisher', ''),
+                    'publish_year': parse_year(book.get('publishedDate')),
+                    'isbn': isbn,
+                    'rating': book.get('averageRating'),
+                    'url': book.get('infoLink'),
+                    'source': 'Google Books'
+                }
+
+        except Exception as e:
+            logger.warning("Google Books ISBN查询失败: %s", e)
+
+        return None
+
     def _search_open_library(self, title: str, author: str = None) -> Optional[Dict]:
         """使用Open Library API搜索"""
         try:
@@ -36,7 +129,7 @@ class BookAPI:
 
             url = f"https://openlibrary.org/search.json?title={urllib.parse.quote(query)}&limit=5"
 
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url, breaker='open_library', timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -48,7 +141,7 @@ class BookAPI:
                     'title': book.get('title', ''),
                     'author': ', '.join(book.get('author_name', [])) if book.get('author_name') else '',
                     'publisher': ', '.join(book.get('publisher', [])) if book.get('publisher') else '',
-                    'publish_year': book.get('first_publish_year'),
+                    'publish_year': parse_year(book.get('first_publish_year')),
                     'isbn': book.get('isbn', [None])[0] if book.get('isbn') else None,
                     'rating': None,  # Open Library 没有评分
                     'url': f"https://openlibrary.org{book.get('key', '')}" if book.get('key') else None,
@@ -56,7 +149,7 @@ class BookAPI:
                 }
 
         except Exception as e:
-            print(f"Open Library搜索失败: {e}")
+            logger.warning("Open Library搜索失败: %s", e)
 
         return None
 
@@ -70,7 +163,7 @@ class BookAPI:
 
             url = f"https://www.googleapis.com/books/v1/volumes?q={urllib.parse.quote(query)}&maxResults=5"
 
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url, breaker='google_books', timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -82,7 +175,7 @@ class BookAPI:
                     'title': book.get('title', ''),
                     'author': ', '.join(book.get('authors', [])) if book.get('authors') else '',
                     'publisher': book.get('publisher', ''),
-                    'publish_year': book.get('publishedDate', '').split('-')[0] if book.get('publishedDate') else None,
+                    'publish_year': parse_year(book.get('publishedDate')),
                     'isbn': None,
                     'rating': book.get('averageRating'),
                     'url': book.get('infoLink'),
@@ -90,6 +183,6 @@ class BookAPI:
                 }
 
         except Exception as e:
-            print(f"Google Books搜索失败: {e}")
+            logger.warning("Google Books搜索失败: %s", e)
 
         return None
\ No newline at end of file
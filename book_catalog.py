@@ -0,0 +1,287 @@
+"""
+本地书库
+批量导入书籍数据（JSONL/CSV），在内存中用字符n-gram倒排索引做模糊书名查找，
+命中时直接返回评分等信息，未命中才访问豆瓣。
+
+命令行:
+    python book_catalog.py import books.jsonl --db /tmp/book_catalog.db
+    python book_catalog.py lookup 活着 --db /tmp/book_catalog.db
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from title_match import normalize_title, is_title_match, MIN_LENGTH_RATIO
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 2
+
+
+def title_ngrams(title: str) -> set:
+    """书名的字符n-gram集合（短于n的书名使用整个书名）"""
+    if len(title) < NGRAM_SIZE:
+        return {title} if title else set()
+    return {title[i:i + NGRAM_SIZE] for i in range(len(title) - NGRAM_SIZE + 1)}
+
+
+class BookCatalog:
+    """本地书库：SQLite存储书籍记录和n-gram倒排表，查找在内存中完成"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._titles: List[str] = ['']  # 按书籍ID索引的规范化书名，0号占位
+        self._gram_counts = array('H', [0])  # 每本书的不同n-gram数
+        self._exact: Dict[str, int] = {}  # 规范化书名 -> 第一本书的ID
+        self._postings: Dict[str, array] = {}  # n-gram -> 书籍ID列表
+        self._local = threading.local()
+        self.loaded = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path))
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _read_records(source_path: Path) -> Iterable[Dict]:
+        """读取JSONL或CSV文件，字段: title, author, publisher, rating, url（或 subject_url）"""
+        with open(source_path, 'r', encoding='utf-8') as f:
+            if source_path.suffix.lower() == '.csv':
+                yield from csv.DictReader(f)
+            else:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+
+    @classmethod
+    def import_file(cls, db_path: Path, source_path: Path, batch_size: int = 10000) -> int:
+        """
+        导入书籍数据，替换已有书库，同时写入n-gram倒排表
+
+        Returns:
+            导入的书籍数量
+        """
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript(
+            'DROP TABLE IF EXISTS books;'
+            'DROP TABLE IF EXISTS grams;'
+            'CREATE TABLE books ('
+            ' id INTEGER PRIMARY KEY,'
+            ' title TEXT NOT NULL,'
+            ' norm_title TEXT NOT NULL,'
+            ' gram_count INTEGER NOT NULL,'
+            ' author TEXT,'
+            ' publisher TEXT,'
+            ' rating REAL,'
+            ' url TEXT);'
+            'CREATE TABLE grams (gram TEXT PRIMARY KEY, ids BLOB NOT NULL);'
+        )
+
+        postings = defaultdict(lambda: array('I'))
+        batch = []
+        book_id = 0
+
+        for record in cls._read_records(Path(source_path)):
+            title = (record.get('title') or '').strip()
+            norm = normalize_title(title)
+            if not norm:
+                continue
+
+            book_id += 1
+            grams = title_ngrams(norm)
+            for gram in grams:
+                postings[gram].append(book_id)
+
+            rating = record.get('rating')
+            try:
+                rating = float(rating) if rating not in (None, '') else None
+            except ValueError:
+                rating = None
+
+            batch.append((
+                book_id, title, norm, len(grams),
+                (record.get('author') or '').strip(),
+                (record.get('publisher') or '').strip(),
+                rating,
+                (record.get('url') or record.get('subject_url') or '').strip()
+            ))
+            if len(batch) >= batch_size:
+                conn.executemany('INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                batch = []
+
+        if batch:
+            conn.executemany('INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+
+        conn.executemany(
+            'INSERT INTO grams VALUES (?, ?)',
+            ((gram, ids.tobytes()) for gram, ids in postings.items())
+        )
+        conn.commit()
+        conn.close()
+        return book_id
+
+    def load(self):
+        """把书名和倒排表加载到内存"""
+        start = time.time()
+        conn = self._conn()
+
+        titles = ['']
+        gram_counts = array('H', [0])
+        exact = {}
+        for book_id, norm, gram_count in conn.execute('SELECT id, norm_title, gram_count FROM books ORDER BY id'):
+            titles.append(norm)
+            gram_counts.append(min(gram_count, 65535))
+            exact.setdefault(norm, book_id)
+
+        postings = {}
+        for gram, blob in conn.execute('SELECT gram, ids FROM grams'):
+            ids = array('I')
+            ids.frombytes(blob)
+            postings[gram] = ids
+
+        self._titles, self._gram_counts, self._exact, self._postings = titles, gram_counts, exact, postings
+        self.loaded = True
+        logger.info("📚 本地书库已加载: %s本 (%.0fms)", len(titles) - 1, (time.time() - start) * 1000)
+
+    def __len__(self):
+        return len(self._titles) - 1
+
+    def _candidates(self, norm: str) -> List[int]:
+        """
+        找出可能与查询互相包含的书籍ID
+
+        互相包含意味着较短一方的全部n-gram都出现在较长一方中，
+        因此共享n-gram数必须等于两者n-gram数的较小值；再按长度比过滤。
+        """
+        grams = title_ngrams(norm)
+        counts = Counter()
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                counts.update(ids)
+
+        query_len = len(norm)
+        min_len = query_len * MIN_LENGTH_RATIO
+        max_len = query_len / MIN_LENGTH_RATIO
+        candidates = []
+        for book_id, shared in counts.items():
+            if shared != min(len(grams), self._gram_counts[book_id]):
+                continue
+            if min_len <= len(self._titles[book_id]) <= max_len:
+                candidates.append(book_id)
+        return candidates
+
+    def _fetch(self, book_id: int) -> Dict:
+        row = self._conn().execute(
+            'SELECT title, author, publisher, rating, url FROM books WHERE id = ?', (book_id,)
+        ).fetchone()
+        title, author, publisher, rating, url = row
+        return {
+            'title': title,
+            'author': author or '',
+            'publisher': publisher or '',
+            'rating': rating,
+            'url': url or '',
+            'source': 'catalog'
+        }
+
+    def lookup(self, title: str, author: str = None) -> Optional[Dict]:
+        """
+        查找书籍，匹配规则为 title_match.is_title_match；
+        多本匹配时优先书名完全相同、作者相符、长度最接近的一本
+        """
+        if not self.loaded:
+            self.load()
+
+        norm = title.strip().lower()
+        if not norm:
+            return None
+
+        book_id = self._exact.get(norm)
+        if book_id is not None and not author:
+            return self._fetch(book_id)
+
+        matches = [i for i in self._candidates(norm) if is_title_match(title, self._titles[i])]
+        if not matches:
+            return None
+
+        def rank(book_id):
+            found = self._titles[book_id]
+            return (found == norm, -abs(len(found) - len(norm)))
+
+        matches.sort(key=rank, reverse=True)
+        if author:
+            author_clean = author.strip().lower()
+            for book_id in matches[:20]:
+                record = self._fetch(book_id)
+                if author_clean and author_clean in record['author'].lower():
+                    return record
+
+        return self._fetch(matches[0])
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[BookCatalog]:
+    """按 BOOK_CATALOG_PATH 获取进程级书库，未配置或文件不存在时返回None"""
+    global _catalog
+    db_path = os.getenv('BOOK_CATALOG_PATH')
+    if not db_path or not Path(db_path).exists():
+        return None
+
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                catalog = BookCatalog(Path(db_path))
+                catalog.load()
+                _catalog = catalog
+    return _catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地书库工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='导入JSONL/CSV书籍数据')
+    import_parser.add_argument('source')
+    import_parser.add_argument('--db', default=os.getenv('BOOK_CATALOG_PATH', '/tmp/book_catalog.db'))
+
+    lookup_parser = subparsers.add_parser('lookup', help='查找书籍')
+    lookup_parser.add_argument('title')
+    lookup_parser.add_argument('--author')
+    lookup_parser.add_argument('--db', default=os.getenv('BOOK_CATALOG_PATH', '/tmp/book_catalog.db'))
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        start = time.time()
+        count = BookCatalog.import_file(Path(args.db), Path(args.source))
+        print(f"✅ 导入完成: {count}本 ({time.time() - start:.1f}s) -> {args.db}")
+    elif args.command == 'lookup':
+        catalog = BookCatalog(Path(args.db))
+        catalog.load()
+        start = time.perf_counter()
+        result = catalog.lookup(args.title, args.author)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(json.dumps(result, ensure_ascii=False, indent=2) if result else "未找到")
+        print(f"⏱️  查找耗时: {elapsed:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,69 @@
 import base64
+import re
 import requests
-from typing import Dict
+from typing import Dict, Tuple, Union
 import json
 import logging
 
+from http_client import get_client
+from circuit_breaker import get_breaker, is_failure_status
+from metrics import stage
+from logging_setup import DETAIL
+
 logger = logging.getLogger(__name__)
 
+# 标准base64字母表（可带结尾的=填充）
+_BASE64_PATTERN = re.compile(rb'[A-Za-z0-9+/]*={0,2}')
+_WHITESPACE_PATTERN = re.compile(rb'\s+')
+# JSON序列化请求体时代替图片数据的占位符
+_IMAGE_PLACEHOLDER = '__BOOK_IMAGE_BASE64__'
+
+
+def _sniff_mime(head: bytes) -> str:
+    """根据文件头判断图片类型，无法识别时按JPEG处理"""
+    if head.startswith(b'\x89PNG'):
+        return 'image/png'
+    if head.startswith(b'GIF8'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def normalize_base64_image(data: Union[str, bytes]) -> Tuple[bytes, str]:
+    """
+    校验客户端已编码的base64图片，不解码整张图片
+
+    支持 data:image/...;base64, 前缀和换行。
+
+    Returns:
+        (base64字节, MIME类型)
+
+    Raises:
+        ValueError: 不是合法的base64数据
+    """
+    if not isinstance(data, (str, bytes)):
+        raise ValueError('不是合法的base64图片数据')
+    if isinstance(data, str):
+        try:
+            data = data.encode('ascii')
+        except UnicodeEncodeError:
+            raise ValueError('不是合法的base64图片数据') from None
+
+    mime = None
+    if data.startswith(b'data:'):
+        header, _, data = data.partition(b',')
+        if header.endswith(b';base64'):
+            mime = header[5:-7].decode('ascii') or None
+
+    if _WHITESPACE_PATTERN.search(data):
+        data = _WHITESPACE_PATTERN.sub(b'', data)
+
+    if not data or len(data) % 4 or not _BASE64_PATTERN.fullmatch(data):
+        raise ValueError('不是合法的base64图片数据')
+
+    return data, mime or _sniff_mime(base64.b64decode(data[:24]))
+
 
 class BookInfoExtractor:
     """使用Grok API从书籍图片中提取信息"""
@@ -36,16 +94,101 @@ class BookInfoExtractor:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self.client = get_client(self.headers)
+
+    def extract_book_info(self, image_path: str = None, image_bytes: bytes = None,
+                          image_base64: Union[str, bytes] = None) -> Dict[str, str]:
+        """
+        从书籍图片中提取信息
+
+        图片三选一：文件路径、原始字节、客户端已编码的base64（见 normalize_base64_image）。
+        base64 图片不解码，直接拼接进VLM请求体。
+        """
+        if image_base64 is not None:
+            base64_image, mime = normalize_base64_image(image_base64)
+        else:
+            if image_bytes is None:
+                with open(image_path, "rb") as image_file:
+                    image_bytes = image_file.read()
+            base64_image, mime = base64.b64encode(image_bytes), _sniff_mime(image_bytes[:12])
+
+        body = self._build_request_body(base64_image, mime)
+
+        # VLM接口熔断时直接返回空结果，让用户手动输入
+        circuit = get_breaker('vlm')
+        if not circuit.allow():
+            logger.warning("VLM接口熔断中，跳过AI识别")
+            return {}
+
+        try:
+            try:
+                with stage('vlm'):
+                    response = self.client.post(
+                        self.api_endpoint,
+                        data=body,
+                        timeout=30
+                    )
+            except Exception:
+                circuit.record_failure()
+                raise
+
+            if is_failure_status(response.status_code):
+                circuit.record_failure()
+            else:
+                circuit.record_success()
+            response.raise_for_status()
+
+            result = response.json()
+            content = result['choices'][0]['message']['content']
+
+            # 原始响应只在调试级别按请求采样输出
+            logger.debug("AI原始响应: %s", content, extra=DETAIL)
+
+            # 清理响应内容
+            content = content.strip()
+
+            # 移除可能的markdown代码块标记
+            if content.startswith('```json'):
+                content = content[7:]
+            if content.startswith('```'):
+                content = content[3:]
+            if content.endswith('```'):
+                content = content[:-3]
+
+            content = content.strip()
+
+            # 尝试解析JSON
+            try:
+                book_info = json.loads(content)
+
+                # 清理返回的数据
+                if 'title' in book_info:
+                    book_info['title'] = book_info['title'].strip().strip('"').strip()
+                if 'author' in book_info:
+                    book_info['author'] = book_info['author'].strip().strip('"').strip()
+                if 'publisher' in book_info:
+                    book_info['publisher'] = book_info['publisher'].strip().strip('"').strip()
+
+                return book_info
+
+            except json.JSONDecodeError:
+                # 如果JSON解析失败,尝试从文本中提取
+                logger.warning("JSON解析失败，尝试文本解析: %s", content)
+                return self._parse_text_response(content)
 
-    def encode_image(self, image_path: str) -> str:
-        """将图片编码为base64"""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        except requests.exceptions.RequestException as e:
+            logger.error("API请求失败: %s", e)
+            if hasattr(e, 'response') and e.response is not None:
+                logger.error("错误详情: %s", e.response.text)
+            return {}
 
-    def extract_book_info(self, image_path: str) -> Dict[str, str]:
-        """从书籍图片中提取信息"""
-        base64_image = self.encode_image(image_path)
+    def _build_request_body(self, base64_image: bytes, mime: str) -> bytes:
+        """
+        VLM请求体（JSON字节）
 
+        先用占位符序列化，再把base64字节拼接进去：图片不经过JSON编码，
+        也不产生额外的str副本，内存中只有base64数据和请求体各一份
+        """
         # 构建更精确的提示词
         system_prompt = """你是一个专业的中文图书信息识别专家。
 请仔细观察图片，准确识别并提取以下信息：
@@ -70,7 +213,6 @@ class BookInfoExtractor:
   "publisher": "出版社"
 }"""
 
-        # API请求
         payload = {
             "model": self.model,
             "messages": [
@@ -88,7 +230,7 @@ class BookInfoExtractor:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
+                                "url": f"data:{mime};base64,{_IMAGE_PLACEHOLDER}",
                                 "detail": "high"  # 使用高分辨率模式
                             }
                         }
@@ -100,58 +242,9 @@ class BookInfoExtractor:
             "top_p": 0.1  # 降低随机性
         }
 
-        try:
-            response = requests.post(
-                self.api_endpoint,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-
-            # 打印原始响应以便调试
-            logger.info(f"AI原始响应: {content}")
-
-            # 清理响应内容
-            content = content.strip()
-
-            # 移除可能的markdown代码块标记
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-
-            content = content.strip()
-
-            # 尝试解析JSON
-            try:
-                book_info = json.loads(content)
-
-                # 清理返回的数据
-                if 'title' in book_info:
-                    book_info['title'] = book_info['title'].strip().strip('"').strip()
-                if 'author' in book_info:
-                    book_info['author'] = book_info['author'].strip().strip('"').strip()
-                if 'publisher' in book_info:
-                    book_info['publisher'] = book_info['publisher'].strip().strip('"').strip()
-
-                return book_info
-
-            except json.JSONDecodeError:
-                # 如果JSON解析失败,尝试从文本中提取
-                logger.warning(f"JSON解析失败，尝试文本解析: {content}")
-                return self._parse_text_response(content)
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API请求失败: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"错误详情: {e.response.text}")
-            return {}
+        head, tail = json.dumps(payload, ensure_ascii=False).encode('utf-8').split(
+            _IMAGE_PLACEHOLDER.encode('ascii'), 1)
+        return b''.join((head, base64_image, tail))
 
     def _parse_text_response(self, content: str) -> Dict[str, str]:
         """从非JSON格式的文本响应中提取信息"""
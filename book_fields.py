@@ -0,0 +1,13 @@
+"""
+书籍字段规范化
+豆瓣详情页、Open Library、Google Books 返回的同一字段格式不同，
+写入结果和规范书籍记录前统一类型，缓存中同一本书的字段类型不随来源变化。
+"""
+import re
+from typing import Optional
+
+
+def parse_year(date_text) -> Optional[int]:
+    """从出版日期（如 "2012-8-1"、"August 2012"、2012）中取出年份，统一为int"""
+    match = re.search(r'\d{4}', str(date_text)) if date_text else None
+    return int(match.group()) if match else None
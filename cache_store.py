@@ -0,0 +1,432 @@
+"""
+缓存存储层
+- LRUCache: 进程内LRU内存缓存，位于持久化存储之前
+- ExpiringBloomFilter: 带过期的布隆过滤器，记录确认不存在的查询（负缓存）
+- FileCacheStore: 每个键一个JSON文件（原有实现）
+- SQLiteCacheStore: 单个SQLite数据库（WAL模式），支持多进程并发读取
+
+命令行迁移工具:
+    python cache_store.py migrate /tmp/douban_cache /tmp/douban_cache.db
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """线程安全的进程内LRU缓存（带TTL和容量上限）"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        """
+        Args:
+            max_size: 最大条目数，超出后淘汰最久未使用的条目
+            ttl: 条目存活时间（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取条目，过期或不存在返回None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Dict, ttl: float = None):
+        """写入条目，可单独指定TTL"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        """删除条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+class ExpiringBloomFilter:
+    """
+    带过期的布隆过滤器（负缓存）
+
+    两代位图轮换：写入当前代，查询两代；每过 ttl/2 丢弃旧一代，
+    因此条目在加入后 ttl/2 ~ ttl 秒内过期。有一定误判率（把未加入的键判为存在），不会漏判。
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, ttl: float = 1800):
+        """
+        Args:
+            capacity: 每一代预期容纳的条目数
+            error_rate: 达到容量时的误判率
+            ttl: 条目最长存活时间（秒）
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ttl = ttl
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+
+        self._current = bytearray((self.num_bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._current_count = 0
+        self._rotated_at = time.time()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def _rotate(self, now: float):
+        """超过半个TTL则轮换：当前代变为旧一代，新建空的当前代"""
+        elapsed = now - self._rotated_at
+        if elapsed < self.ttl / 2:
+            return
+        if elapsed >= self.ttl:
+            # 两代都已过期
+            self._previous = bytearray(len(self._current))
+        else:
+            self._previous = self._current
+        self._current = bytearray(len(self._previous))
+        self._current_count = 0
+        self._rotated_at = now
+
+    def add(self, key: str):
+        positions = self._positions(key)
+        with self._lock:
+            self._rotate(time.time())
+            for pos in positions:
+                self._current[pos >> 3] |= 1 << (pos & 7)
+            self._current_count += 1
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        with self._lock:
+            self._rotate(time.time())
+            found = any(
+                all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+                for bits in (self._current, self._previous)
+            )
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def clear(self):
+        with self._lock:
+            self._current = bytearray(len(self._current))
+            self._previous = bytearray(len(self._current))
+            self._current_count = 0
+            self._rotated_at = time.time()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'bytes': len(self._current) * 2,
+                'num_hashes': self.num_hashes,
+                'current_count': self._current_count,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class FileCacheStore:
+    """文件缓存：每个键一个 {key}.json 文件"""
+
+    def __init__(self, cache_dir: Path, ttl: float = 3600):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _get_cache_file(self, key: str) -> Path:
+        """获取缓存文件路径"""
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取条目（包含 _cached_at），过期或损坏则删除并返回None"""
+        cache_file = self._get_cache_file(key)
+        if not cache_file.exists():
+            return None
+
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached_data = json.load(f)
+
+            expires_at = cached_data.get('_expires_at')
+            if expires_at is None:
+                expires_at = cached_data.get('_cached_at', 0) + self.ttl
+            if time.time() < expires_at:
+                return cached_data
+
+            # 过期则删除
+            cache_file.unlink()
+        except Exception as e:
+            logger.warning("  ⚠️  读取缓存失败: %s", e)
+            # 读取失败则删除损坏的缓存文件
+            if cache_file.exists():
+                cache_file.unlink()
+
+        return None
+
+    def set(self, key: str, data: Dict, ttl: float = None):
+        """写入条目，data 需已包含 _cached_at"""
+        cached_data = dict(data)
+        cached_data['_expires_at'] = cached_data.get('_cached_at', time.time()) + (self.ttl if ttl is None else ttl)
+        with open(self._get_cache_file(key), 'w', encoding='utf-8') as f:
+            json.dump(cached_data, f, ensure_ascii=False, indent=2)
+
+    def delete(self, key: str):
+        """删除条目"""
+        cache_file = self._get_cache_file(key)
+        if cache_file.exists():
+            cache_file.unlink()
+
+    def sweep(self) -> int:
+        """删除所有过期文件，返回删除数量"""
+        removed = 0
+        for cache_file in self.cache_dir.glob('*.json'):
+            if self.get(cache_file.stem) is None:
+                removed += 1
+        return removed
+
+
+class SQLiteCacheStore:
+    """SQLite缓存：单库单表，WAL模式，expires_at 建索引，批量清理过期条目"""
+
+    def __init__(self, db_path: Path, ttl: float = 3600, sweep_interval: float = 300):
+        """
+        Args:
+            db_path: 数据库文件路径
+            ttl: 默认存活时间（秒）
+            sweep_interval: 两次批量清理之间的最小间隔（秒）
+        """
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._last_sweep = time.time()
+        self._sweep_lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' cached_at REAL NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)')
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（gunicorn多进程下各进程各自打开）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取未过期条目（包含 _cached_at 和 _expires_at）"""
+        try:
+            row = self._conn().execute(
+                'SELECT value, cached_at, expires_at FROM cache WHERE key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("  ⚠️  读取缓存失败: %s", e)
+            return None
+
+        if row is None:
+            return None
+
+        cached_data = json.loads(row[0])
+        cached_data['_cached_at'] = row[1]
+        cached_data['_expires_at'] = row[2]
+        return cached_data
+
+    def set(self, key: str, data: Dict, ttl: float = None):
+        """写入条目，data 需已包含 _cached_at"""
+        cached_at = data.get('_cached_at', time.time())
+        expires_at = cached_at + (self.ttl if ttl is None else ttl)
+        value = json.dumps({k: v for k, v in data.items() if k != '_cached_at'}, ensure_ascii=False)
+        self._conn().execute(
+            'INSERT OR REPLACE INTO cache (key, value, cached_at, expires_at) VALUES (?, ?, ?, ?)',
+            (key, value, cached_at, expires_at)
+        )
+        self._maybe_sweep()
+
+    def set_many(self, items):
+        """批量写入 [(key, data, ttl), ...]，用于迁移"""
+        rows = []
+        for key, data, ttl in items:
+            cached_at = data.get('_cached_at', time.time())
+            value = json.dumps({k: v for k, v in data.items() if k != '_cached_at'}, ensure_ascii=False)
+            rows.append((key, value, cached_at, cached_at + (self.ttl if ttl is None else ttl)))
+
+        conn = self._conn()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, cached_at, expires_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(rows)
+
+    def delete(self, key: str):
+        """删除条目"""
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def sweep(self) -> int:
+        """批量删除过期条目（走 expires_at 索引），返回删除数量"""
+        cursor = self._conn().execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+        self._last_sweep = time.time()
+        return cursor.rowcount
+
+    def _maybe_sweep(self):
+        """写入时按间隔触发批量清理"""
+        if time.time() - self._last_sweep < self.sweep_interval:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            removed = self.sweep()
+            if removed:
+                logger.info("  🧹 清理过期缓存: %s条", removed)
+        except sqlite3.Error as e:
+            logger.warning("  ⚠️  清理过期缓存失败: %s", e)
+        finally:
+            self._sweep_lock.release()
+
+
+def create_cache_store(cache_dir: Path, ttl: float = 3600):
+    """
+    根据环境变量创建持久化缓存存储
+
+    DOUBAN_CACHE_BACKEND: file（默认）或 sqlite
+    DOUBAN_CACHE_DB: SQLite数据库路径，默认 {cache_dir}.db
+    """
+    backend = os.getenv('DOUBAN_CACHE_BACKEND', 'file').lower()
+    if backend == 'sqlite':
+        db_path = os.getenv('DOUBAN_CACHE_DB') or f"{cache_dir}.db"
+        return SQLiteCacheStore(Path(db_path), ttl=ttl)
+    return FileCacheStore(cache_dir, ttl=ttl)
+
+
+def migrate_file_cache(cache_dir: Path, db_path: Path, ttl: float = 3600, batch_size: int = 500) -> Dict:
+    """将 {key}.json 文件缓存目录导入SQLite，跳过已过期和损坏的文件"""
+    store = SQLiteCacheStore(db_path, ttl=ttl)
+    now = time.time()
+    stats = {'imported': 0, 'expired': 0, 'invalid': 0}
+    batch = []
+
+    for cache_file in Path(cache_dir).glob('*.json'):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            stats['invalid'] += 1
+            continue
+
+        cached_at = data.get('_cached_at', 0)
+        expires_at = data.pop('_expires_at', cached_at + ttl)
+        if expires_at <= now:
+            stats['expired'] += 1
+            continue
+
+        batch.append((cache_file.stem, data, expires_at - cached_at))
+        if len(batch) >= batch_size:
+            stats['imported'] += store.set_many(batch)
+            batch = []
+
+    if batch:
+        stats['imported'] += store.set_many(batch)
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='豆瓣缓存存储工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='将文件缓存目录导入SQLite')
+    migrate_parser.add_argument('cache_dir', nargs='?', default='/tmp/douban_cache')
+    migrate_parser.add_argument('db_path', nargs='?', default='/tmp/douban_cache.db')
+    migrate_parser.add_argument('--ttl', type=float, default=3600)
+
+    sweep_parser = subparsers.add_parser('sweep', help='清理SQLite中的过期条目')
+    sweep_parser.add_argument('db_path', nargs='?', default='/tmp/douban_cache.db')
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        stats = migrate_file_cache(Path(args.cache_dir), Path(args.db_path), ttl=args.ttl)
+        print(f"✅ 迁移完成: 导入 {stats['imported']} 条, 过期 {stats['expired']} 条, 损坏 {stats['invalid']} 条")
+    elif args.command == 'sweep':
+        removed = SQLiteCacheStore(Path(args.db_path)).sweep()
+        print(f"🧹 已清理 {removed} 条过期缓存")
+
+
+if __name__ == "__main__":
+    main()
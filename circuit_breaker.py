@@ -0,0 +1,168 @@
+"""
+熔断器
+每个上游（豆瓣网页搜索、豆瓣读书搜索、书籍详情页、Open Library、Google Books、VLM）一个熔断器：
+- 关闭: 正常放行，按时间窗口统计失败率
+- 打开: 失败率超过阈值后直接拒绝，调用方立即转向下一个策略或兜底结果
+- 半开: 冷却时间过后放行少量探测请求，成功则关闭，失败则重新打开
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求被直接拒绝"""
+
+
+class CircuitBreaker:
+    """线程安全的失败率熔断器"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, window: float = 30, min_requests: int = 5, failure_rate: float = 0.5,
+                 cooldown: float = 30, half_open_probes: int = 1):
+        """
+        Args:
+            name: 上游名称
+            window: 失败率统计窗口（秒）
+            min_requests: 窗口内请求数达到该值才计算失败率
+            failure_rate: 打开熔断的失败率阈值
+            cooldown: 打开后多久进入半开状态（秒）
+            half_open_probes: 半开状态下同时放行的探测请求数
+        """
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self._events = deque()  # (时间, 是否成功)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened_count = 0
+
+    def _prune(self, now: float):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._events.clear()
+        self.opened_count += 1
+
+    def is_open(self) -> bool:
+        """熔断打开且仍在冷却期内（不改变状态）"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        """请求是否放行；冷却期结束后转为半开并放行探测请求"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self._opened_at < self.cooldown:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes = 0
+
+            if self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._events.clear()
+                self._probes = 0
+                return
+            now = time.monotonic()
+            self._events.append((now, True))
+            self._prune(now)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._open(now)
+                return
+            if self.state == self.OPEN:
+                return
+
+            self._events.append((now, False))
+            self._prune(now)
+            total = len(self._events)
+            if total >= self.min_requests:
+                failures = sum(1 for _, ok in self._events if not ok)
+                if failures / total >= self.failure_rate:
+                    self._open(now)
+
+    def check(self):
+        """放行检查，被拒绝时抛出 CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(f"熔断器已打开: {self.name}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            total = len(self._events)
+            failures = sum(1 for _, ok in self._events if not ok)
+            return {
+                'state': self.state,
+                'window_requests': total,
+                'window_failure_rate': round(failures / total, 4) if total else 0.0,
+                'rejected': self.rejected,
+                'opened_count': self.opened_count
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取指定上游的熔断器（参数来自环境变量，可用 CIRCUIT_COOLDOWN_<NAME> 单独设置冷却时间）"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                cooldown = os.getenv(f'CIRCUIT_COOLDOWN_{name.upper()}') or os.getenv('CIRCUIT_COOLDOWN', 30)
+                breaker = CircuitBreaker(
+                    name,
+                    window=float(os.getenv('CIRCUIT_WINDOW', 30)),
+                    min_requests=int(os.getenv('CIRCUIT_MIN_REQUESTS', 5)),
+                    failure_rate=float(os.getenv('CIRCUIT_FAILURE_RATE', 0.5)),
+                    cooldown=float(cooldown)
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def breaker_stats() -> Dict:
+    """所有熔断器的状态"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+def is_failure_status(status_code: int) -> bool:
+    """计为上游故障的HTTP状态码（服务端错误和限流）"""
+    return status_code >= 500 or status_code in (403, 429)
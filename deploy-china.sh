@@ -42,9 +42,11 @@ Flask==2.3.2
 Flask-CORS==4.0.0
 requests==2.31.0
 beautifulsoup4==4.12.2
+lxml==5.2.2
 python-dotenv==1.0.0
 Pillow==9.5.0
-gunicorn==20.1.0
+gunicorn==22.0.0
+gevent==24.2.1
 EOF
 
 pip install -r requirements.txt
@@ -61,16 +63,10 @@ echo "请编辑 .env 文件，填入你的真实API密钥"
 
 # 9. 配置Gunicorn
 echo "9. 配置Gunicorn..."
-cat > gunicorn.conf.py << EOF
-bind = "127.0.0.1:5000"
-workers = 2
-worker_class = "sync"
-worker_connections = 1000
-max_requests = 1000
-max_requests_jitter = 100
-timeout = 30
-keepalive = 5
-preload_app = True
+# 使用项目自带的 gunicorn.conf.py（gevent 协程模式），这里只写入监听地址和进程数
+cat >> .env << EOF
+GUNICORN_BIND=127.0.0.1:5000
+GUNICORN_WORKERS=2
 EOF
 
 # 10. 配置Nginx
@@ -1,26 +1,145 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Callable
 import time
+import functools
 import urllib.parse
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import contextvars
+import threading
 import logging
 import hashlib
-import json
 import os
 from pathlib import Path
 
+from book_fields import parse_year
+from cache_store import LRUCache, ExpiringBloomFilter, create_cache_store
+from http_client import get_client, validator_headers, RevalidationStats
+from rate_limiter import douban_rate_limiters, RateLimitExceeded
+from circuit_breaker import get_breaker, is_failure_status, CircuitOpenError
+from singleflight import SingleFlight
+from task_pool import PriorityTaskPool
+from metrics import stage, timed
+from title_match import rank_candidates, is_title_match
+from book_catalog import get_catalog
+from html_parser import (
+    parse_html, restricted_parsing_enabled, streaming_enabled, read_until_results, stream_stats,
+    WEB_RESULT_STRAINER, BOOK_RESULT_STRAINER, WEB_RESULT_CONTAINERS, BOOK_RESULT_CONTAINERS
+)
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 搜索页中的书籍详情链接（正则兜底用）
+SUBJECT_URL_PATTERN = re.compile(r'(https://book\.douban\.com/subject/\d+/)')
+
+
+def _is_web_candidate_node(tag) -> bool:
+    """豆瓣搜索页中产生候选的节点：div.result 或指向书籍的链接"""
+    if tag.name == 'div':
+        return 'result' in (tag.get('class') or ())
+    if tag.name == 'a':
+        href = tag.get('href') or ''
+        return 'book.douban.com/subject' in href or 'link2' in href
+    return False
+
+
+def _unwrap_link(url: Optional[str]) -> Optional[str]:
+    """豆瓣跳转链接 link2/?url=... 还原为真实URL"""
+    if url and 'link2' in url:
+        match = re.search(r'url=([^&]+)', url)
+        if match:
+            return urllib.parse.unquote(match.group(1))
+    return url
+
+
+def _clean_result_title(text: str) -> str:
+    return re.sub(r'\s+', ' ', text.replace('[书籍]', '').strip())
+
+
+def _split_cast(cast_text: str):
+    """'作者 / 出版社 / ...' -> (作者, 出版社)"""
+    parts = [p.strip() for p in cast_text.split('/')]
+    return parts[0], (parts[1] if len(parts) >= 2 else '')
+
+
+def _parse_rating(rating_elem) -> Optional[float]:
+    if rating_elem is None:
+        return None
+    try:
+        return float(rating_elem.get_text(strip=True))
+    except ValueError:
+        return None
+
+
+class SearchUnavailable(Exception):
+    """搜索策略因网络错误、熔断或非200响应而未能完成（区别于正常完成但未找到）"""
+
 
 class DoubanScraper:
-    """最强健版豆瓣图书搜索（带文件缓存优化）"""
+    """最强健版豆瓣图书搜索（带内存+持久化缓存优化）"""
 
     # 缓存配置
     _cache_dir = Path('/tmp/douban_cache')  # 使用临时目录作为缓存目录
-    _cache_ttl = 3600  # 缓存1小时
+    _cache_ttl = 3600  # 缓存1小时（软TTL：超过后视为过期，但仍可先返回旧值）
+    # 硬TTL：过期条目在此时间内按 stale-while-revalidate 返回并后台刷新，超过后彻底失效
+    _cache_stale_ttl = int(os.getenv('DOUBAN_CACHE_STALE_TTL', 86400))
+    # 按结果来源的软TTL：来源越可靠缓存越久，未列出的来源使用 _cache_ttl
+    _source_ttls = {
+        'douban': _cache_ttl,
+        'link_context': _cache_ttl,
+        'douban_book': _cache_ttl,
+        'douban_isbn': _cache_ttl,
+        'regex_match': 1800,  # 只匹配到链接，没有评分等信息
+        'Open Library': 21600,
+        'Google Books': 21600,
+        # 搜索出错导致的兜底结果：很快视为过期并优先后台重新搜索
+        'fallback': int(os.getenv('DOUBAN_FALLBACK_RETRY', 15)),
+    }
+    # 兜底结果的硬TTL：超过后不再返回，下次请求直接重新搜索
+    _fallback_ttl = int(os.getenv('DOUBAN_FALLBACK_TTL', 120))
+    # 负缓存：所有策略正常完成但确认未找到的查询，过期前直接返回兜底结果而不访问豆瓣
+    _negative_cache = ExpiringBloomFilter(
+        capacity=int(os.getenv('DOUBAN_NEGATIVE_CACHE_SIZE', 100000)),
+        ttl=int(os.getenv('DOUBAN_NEGATIVE_TTL', 1800))
+    )
+    # 短评缓存：按书籍页面URL缓存页面上的全部短评，较小的limit直接切片返回
+    _comments_ttl = int(os.getenv('DOUBAN_COMMENTS_TTL', 21600))
+    # 书籍详情缓存：详情页一次下载解析出评分、评价人数、ISBN、简介和短评
+    _detail_ttl = int(os.getenv('DOUBAN_DETAIL_TTL', 21600))
+    # 详情保留时间：过期的详情连同 ETag / Last-Modified 保留到此时，刷新时发条件请求，304则直接复用
+    _detail_keep_ttl = int(os.getenv('DOUBAN_DETAIL_KEEP_TTL', 604800))
+    # 详情页条件请求统计（304命中率、节省字节数）
+    _revalidation = RevalidationStats()
+    # 持久化缓存存储（DOUBAN_CACHE_BACKEND=file|sqlite），首次使用时创建
+    _cache_store = None
+    # 进程级搜索线程池：搜索策略在此并行竞速，落后的策略被分离而不阻塞响应。
+    # 被分离的策略在其HTTP请求结束前仍占用线程，因此上限按请求并发量而不是CPU数设置：
+    # 每个并发搜索占2个线程，另留出给落后策略的余量；线程按需创建，空闲线程被复用
+    _search_executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv('DOUBAN_SEARCH_WORKERS', 256)),
+        thread_name_prefix='douban-search'
+    )
+    _search_timeout = 8  # 并行搜索总超时（秒）
+    # 单飞合并：相同缓存键的并发搜索 / 相同页面的并发短评请求只访问一次豆瓣
+    _inflight = SingleFlight()
+    # 后台刷新任务池（独立于搜索线程池，避免刷新任务占满搜索线程导致互相等待）；
+    # 兜底结果的重新搜索优先于普通过期条目的刷新
+    _refresh_pool = PriorityTaskPool(
+        max_workers=int(os.getenv('DOUBAN_REFRESH_WORKERS', 2)),
+        thread_name_prefix='douban-refresh'
+    )
+    REFRESH_PRIORITY_FALLBACK = 0
+    REFRESH_PRIORITY_STALE = 1
+    # 后台刷新失败（上游出错）时保留原条目，按 间隔×次数 延迟重试，最多重试 _refresh_max_retries 次
+    _refresh_retry_delay = int(os.getenv('DOUBAN_REFRESH_RETRY_DELAY', 30))
+    _refresh_max_retries = int(os.getenv('DOUBAN_REFRESH_MAX_RETRIES', 3))
+    _refreshing = set()
+    _refreshing_lock = threading.Lock()
+    # 进程内LRU内存缓存，所有实例共享，位于文件缓存之前
+    _memory_cache = LRUCache(
+        max_size=int(os.getenv('DOUBAN_MEMORY_CACHE_SIZE', 2048)),
+        ttl=_cache_stale_ttl
+    )
 
     def __init__(self):
         self.headers = {
@@ -31,11 +150,8 @@ class DoubanScraper:
             'Referer': 'https://www.douban.com/',
             'Upgrade-Insecure-Requests': '1',
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
-
-        # 确保缓存目录存在
-        self._cache_dir.mkdir(exist_ok=True)
+        # 使用进程级共享连接池，复用到豆瓣的keep-alive连接
+        self.session = get_client(self.headers)
 
     @staticmethod
     def _get_cache_key(title: str, author: str = None, publisher: str = None) -> str:
@@ -49,54 +165,200 @@ class DoubanScraper:
         return hashlib.md5(key_str.encode('utf-8')).hexdigest()
 
     @classmethod
-    def _get_cache_file(cls, cache_key: str) -> Path:
-        """获取缓存文件路径"""
-        return cls._cache_dir / f"{cache_key}.json"
+    def _get_cache_store(cls):
+        """获取持久化缓存存储（条目保留到硬TTL）"""
+        if cls._cache_store is None:
+            cls._cache_store = create_cache_store(cls._cache_dir, ttl=cls._cache_stale_ttl)
+        return cls._cache_store
 
     @classmethod
-    def _get_from_cache(cls, cache_key: str) -> Optional[Dict]:
-        """从文件缓存获取结果"""
-        cache_file = cls._get_cache_file(cache_key)
+    def _get_cache_entry(cls, cache_key: str) -> Optional[Dict]:
+        """读取原始缓存条目（包含 _cached_at，先查内存LRU，未命中再读持久化缓存）"""
+        cached_data = cls._memory_cache.get(cache_key)
+        if cached_data is not None:
+            logger.info("  ⚡ 内存缓存命中: %s...", cache_key[:8])
+            return cached_data
 
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cached_data = json.load(f)
-
-                # 检查是否过期
-                timestamp = cached_data.get('_cached_at', 0)
-                if time.time() - timestamp < cls._cache_ttl:
-                    logger.info(f"  💾 缓存命中: {cache_key[:8]}...")
-                    # 返回数据时移除缓存时间戳
-                    result = {k: v for k, v in cached_data.items() if k != '_cached_at'}
-                    return result
-                else:
-                    # 过期则删除
-                    cache_file.unlink()
-            except Exception as e:
-                logger.warning(f"  ⚠️  读取缓存失败: {e}")
-                # 读取失败则删除损坏的缓存文件
-                if cache_file.exists():
-                    cache_file.unlink()
+        try:
+            cached_data = cls._get_cache_store().get(cache_key)
+        except Exception as e:
+            logger.warning("  ⚠️  读取缓存失败: %s", e)
+            return None
 
-        return None
+        if cached_data is None:
+            return None
+
+        logger.info("  💾 缓存命中: %s...", cache_key[:8])
+        # 回填内存缓存，剩余寿命与持久化缓存一致（保留条目自己的硬TTL，如兜底结果的短TTL）
+        expires_at = cached_data.pop('_expires_at', None)
+        if expires_at is None:
+            expires_at = cached_data.get('_cached_at', 0) + cls._cache_stale_ttl
+        cls._memory_cache.set(cache_key, cached_data, ttl=max(expires_at - time.time(), 0))
+        return cached_data
 
     @classmethod
-    def _save_to_cache(cls, cache_key: str, data: Dict):
-        """保存到文件缓存"""
-        try:
-            cache_file = cls._get_cache_file(cache_key)
+    def _get_from_cache(cls, cache_key: str, allow_stale: bool = False) -> Optional[Dict]:
+        """
+        从缓存获取结果
+
+        Args:
+            allow_stale: 为True时，超过软TTL但未超过硬TTL的条目也会返回，
+                并带上 _cache = {'status': 'stale', 'age': 秒数}
+        """
+        cached_data = cls._get_cache_entry(cache_key)
+        if cached_data is None:
+            return None
+
+        # 查询别名：解析到按豆瓣ID存储的规范书籍记录
+        if '_subject_id' in cached_data:
+            cached_data = cls._get_cache_entry(cls._get_subject_cache_key(cached_data['_subject_id']))
+            if cached_data is None:
+                return None
+
+        age = time.time() - cached_data.get('_cached_at', 0)
+        soft_ttl = cls._soft_ttl_for(cached_data.get('source'))
+        if age >= soft_ttl and not allow_stale:
+            return None
 
-            # 添加缓存时间戳
-            cached_data = data.copy()
-            cached_data['_cached_at'] = time.time()
+        # 返回副本并移除缓存时间戳，避免调用方修改共享条目
+        result = {k: v for k, v in cached_data.items() if k != '_cached_at'}
+        if age >= soft_ttl:
+            result['_cache'] = {'status': 'stale', 'age': int(age)}
+        return result
+
+    @classmethod
+    def _soft_ttl_for(cls, source: str) -> float:
+        """按结果来源取软TTL"""
+        return cls._source_ttls.get(source, cls._cache_ttl)
+
+    @classmethod
+    def _save_to_cache(cls, cache_key: str, data: Dict, ttl: float = None):
+        """保存到缓存（同时写入内存LRU和持久化缓存），ttl 默认为硬TTL"""
+        # 添加缓存时间戳
+        cached_data = {k: v for k, v in data.items() if k != '_cache'}
+        cached_data['_cached_at'] = time.time()
 
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cached_data, f, ensure_ascii=False, indent=2)
+        cls._memory_cache.set(cache_key, cached_data, ttl=ttl)
 
-            logger.info(f"  💾 已缓存结果: {cache_key[:8]}...")
+        try:
+            cls._get_cache_store().set(cache_key, cached_data, ttl=ttl)
+            logger.info("  💾 已缓存结果: %s...", cache_key[:8])
         except Exception as e:
-            logger.warning(f"  ⚠️  保存缓存失败: {e}")
+            logger.warning("  ⚠️  保存缓存失败: %s", e)
+
+    @staticmethod
+    def _parse_subject_id(url: str) -> Optional[str]:
+        """从 book.douban.com/subject/<id>/ 链接中解析豆瓣书籍ID"""
+        if not url:
+            return None
+        match = re.search(r'book\.douban\.com/subject/(\d+)', url)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _get_subject_cache_key(subject_id: str) -> str:
+        """规范书籍记录的缓存键"""
+        return f"subject_{subject_id}"
+
+    @classmethod
+    def _get_subject(cls, subject_id: str) -> Optional[Dict]:
+        """读取规范书籍记录（不区分软TTL，调用方按需判断）"""
+        cached_data = cls._get_cache_entry(cls._get_subject_cache_key(subject_id))
+        if cached_data is None:
+            return None
+        return {k: v for k, v in cached_data.items() if k != '_cached_at'}
+
+    @classmethod
+    def _merge_subject(cls, subject_id: str, data: Dict) -> Dict:
+        """
+        将新数据合并进规范书籍记录并保存
+
+        新数据中的空值（None、''、[]）不会覆盖记录中已有的值，
+        因此不同查询、不同来源得到的同一本书会合并为一条完整记录。
+        """
+        record = cls._get_subject(subject_id) or {}
+        for key, value in data.items():
+            if key.startswith('_'):
+                continue
+            if value in (None, '', []) and record.get(key) not in (None, '', []):
+                continue
+            record[key] = value
+        record['subject_id'] = subject_id
+        # 旧记录和各来源的出版年统一为int
+        if 'publish_year' in record:
+            record['publish_year'] = parse_year(record['publish_year'])
+
+        cls._save_to_cache(cls._get_subject_cache_key(subject_id), record)
+        return record
+
+    @classmethod
+    def _save_result(cls, cache_key: str, result: Dict) -> Dict:
+        """
+        保存搜索结果：能解析出豆瓣ID的结果合并进规范书籍记录，
+        查询键只保存指向该记录的别名；其余结果（如兜底结果）按查询键直接缓存。
+
+        Returns:
+            最终结果（合并后的规范记录或原结果）
+        """
+        subject_id = cls._parse_subject_id(result.get('url'))
+        if not subject_id:
+            # 兜底结果只短时间缓存，避免一次故障让该书长时间没有评分
+            ttl = cls._fallback_ttl if result.get('source') == 'fallback' else None
+            cls._save_to_cache(cache_key, result, ttl=ttl)
+            return result
+
+        record = cls._merge_subject(subject_id, result)
+        cls._save_to_cache(cache_key, {'_subject_id': subject_id})
+        return record
+
+    def _schedule_refresh(self, cache_key: str, fetch: Callable[[], Optional[Dict]],
+                          priority: int = REFRESH_PRIORITY_STALE):
+        """
+        后台刷新过期条目（同一个键同时只有一个刷新任务，priority 越小越先执行）
+
+        Args:
+            fetch: 重新抓取并写入缓存的无参调用（与同键的前台请求单飞合并）；
+                上游出错时应保留原条目并抛出 SearchUnavailable
+        """
+        with self._refreshing_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        logger.info("  🔄 返回过期缓存并后台刷新: %s...", cache_key[:8])
+        self._submit_refresh(cache_key, fetch, priority)
+
+    def _submit_refresh(self, cache_key: str, fetch: Callable[[], Optional[Dict]],
+                        priority: int, attempt: int = 0):
+        """
+        提交刷新任务
+
+        fetch 抛出 SearchUnavailable（上游出错，原有的过期条目已保留）时延迟后重试；
+        等待重试期间该键仍标记为刷新中，读请求不会重复触发刷新。
+        """
+        def refresh():
+            retry = False
+            try:
+                self._inflight.do(cache_key, fetch)
+                logger.info("  🔄 后台刷新完成: %s...", cache_key[:8])
+            except SearchUnavailable as e:
+                retry = attempt < self._refresh_max_retries
+                logger.warning("  ⚠️  后台刷新失败，保留过期缓存%s: %s",
+                               f"，{self._refresh_retry_delay * (attempt + 1)}秒后重试" if retry else '', e)
+            except Exception as e:
+                logger.warning("  ⚠️  后台刷新失败: %s", e)
+            finally:
+                if retry:
+                    timer = threading.Timer(
+                        self._refresh_retry_delay * (attempt + 1), self._submit_refresh,
+                        args=(cache_key, fetch, priority, attempt + 1)
+                    )
+                    timer.daemon = True
+                    timer.start()
+                else:
+                    with self._refreshing_lock:
+                        self._refreshing.discard(cache_key)
+
+        self._refresh_pool.submit(priority, refresh)
 
     def search_book(self, title: str, author: str = None, publisher: str = None, include_comments: bool = False) -> Optional[Dict]:
         """
@@ -113,8 +375,9 @@ class DoubanScraper:
         # 生成缓存键（不包含短评标志，短评单独获取）
         cache_key = self._get_cache_key(title, author, publisher)
 
-        # 检查缓存
-        cached_result = self._get_from_cache(cache_key)
+        # 检查缓存和本地书库
+        with stage('cache'):
+            cached_result = self.lookup_cached(title, author, publisher)
         if cached_result:
             # 如果需要短评且缓存中没有，则获取短评
             if include_comments and not cached_result.get('short_comments'):
@@ -123,155 +386,404 @@ class DoubanScraper:
                     logger.info("  💬 获取短评...")
                     cached_result['short_comments'] = self._get_short_comments(cached_result['url'])
                     comment_time = (time.time() - comment_start) * 1000
-                    logger.info(f"  ✅ 短评获取完成: {comment_time:.2f}ms")
+                    logger.info("  ✅ 短评获取完成: %.2fms", comment_time)
 
             total_time = (time.time() - search_start) * 1000
-            logger.info(f"  ⏱️  缓存查询总耗时: {total_time:.2f}ms")
+            logger.info("  ⏱️  缓存查询总耗时: %.2fms", total_time)
             return cached_result
 
-        logger.info(f"  🔎 开始并行搜索: {title}")
+        # 相同查询的并发请求合并为一次豆瓣搜索
+        try:
+            result, shared = self._inflight.do(cache_key, self._search_uncached, title, author, publisher, cache_key)
+        except SearchUnavailable:
+            # 合并到了失败的后台刷新：返回它保留的过期条目
+            result, shared = self._get_from_cache(cache_key, allow_stale=True) or \
+                self._create_fallback_result(title, author, publisher), True
+        if shared:
+            logger.info("  🔗 合并并发搜索: %s...", cache_key[:8])
+        # 结果对象在合并的调用方之间共享，复制后再修改
+        result = dict(result) if result else result
+
+        # 只在明确要求时才获取短评
+        if result and include_comments and result.get('url'):
+            comment_start = time.time()
+            logger.info("  💬 获取短评...")
+            result['short_comments'] = self._get_short_comments(result['url'])
+            comment_time = (time.time() - comment_start) * 1000
+            logger.info("  ✅ 短评获取完成: %.2fms", comment_time)
+
+        total_time = (time.time() - search_start) * 1000
+        logger.info("  ⏱️  并行搜索总耗时: %.2fms", total_time)
+
+        return result
+
+    def lookup_cached(self, title: str, author: str = None, publisher: str = None) -> Optional[Dict]:
+        """
+        只查缓存、本地书库和负缓存，不访问网络
+
+        缓存中过期但未超过硬TTL的条目同样返回（带 _cache 标记），并触发后台刷新；
+        过期的兜底结果优先刷新。负缓存命中（近期确认豆瓣没有这本书）时返回兜底结果。
+        """
+        cache_key = self._get_cache_key(title, author, publisher)
+
+        cached_result = self._get_from_cache(cache_key, allow_stale=True)
+        if cached_result:
+            if cached_result.get('_cache', {}).get('status') == 'stale':
+                priority = self.REFRESH_PRIORITY_FALLBACK if cached_result.get('source') == 'fallback' \
+                    else self.REFRESH_PRIORITY_STALE
+                self._schedule_refresh(cache_key, functools.partial(
+                    self._search_uncached, title, author, publisher, cache_key, refresh=True), priority)
+            return cached_result
+
+        # 本地书库（BOOK_CATALOG_PATH）：内存中模糊匹配，命中则无需访问网络
+        result = self._search_catalog(title, author)
+        if result:
+            return result
+
+        if cache_key in self._negative_cache:
+            logger.info("  🚫 负缓存命中: %s...", cache_key[:8])
+            return self._create_fallback_result(title, author, publisher, not_found=True)
+
+        return None
+
+    def _search_catalog(self, title: str, author: str = None) -> Optional[Dict]:
+        """在本地书库中查找，未配置书库或查找失败时返回None"""
+        try:
+            catalog = get_catalog()
+            if catalog is None:
+                return None
+            result = catalog.lookup(title, author)
+            if result:
+                logger.info("  📚 本地书库命中: %s", result.get('title'))
+            return result
+        except Exception as e:
+            logger.warning("  ⚠️  本地书库查找失败: %s", e)
+            return None
+
+    def _search_uncached(self, title: str, author: str, publisher: str, cache_key: str,
+                         refresh: bool = False) -> Optional[Dict]:
+        """
+        缓存未命中时并行执行搜索策略，结果写入缓存
+
+        Args:
+            refresh: 后台刷新调用。所有策略出错时不用兜底结果覆盖已有条目，
+                而是抛出 SearchUnavailable 由刷新任务稍后重试
+        """
+        search_start = time.time()
+        logger.info("  🔎 开始并行搜索: %s", title)
 
         # 使用线程池并行执行多个搜索策略
         result = None
 
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            # 提交两个搜索任务
-            logger.info("  ⚡ 并行提交2个搜索策略...")
-            future_web = executor.submit(self._search_douban_web, title, author)
-            future_book = executor.submit(self._search_douban_book, title, author)
+        # 取消信号：胜出后通知落后策略尽快放弃（不再重试/解析）
+        cancel_event = threading.Event()
+
+        # 跳过熔断打开的策略，全部熔断时直接使用兜底方案
+        strategies = [
+            (strategy, breaker) for strategy, breaker in (
+                (self._search_douban_web, 'douban_web'),
+                (self._search_douban_book, 'douban_book')
+            ) if not get_breaker(breaker).is_open()
+        ]
+        # 出错的策略数（熔断跳过、异常、超时）；为0且无结果时才算确认未找到
+        errors = 2 - len(strategies)
+        if errors:
+            logger.warning("  🔌 熔断跳过 %s 个搜索策略", errors)
+
+        # 提交搜索任务到进程级线程池（在请求上下文的副本中执行，分阶段耗时计入当前请求）
+        logger.info("  ⚡ 并行提交%s个搜索策略...", len(strategies))
+        pending = {
+            self._search_executor.submit(
+                contextvars.copy_context().run, timed(name)(strategy), title, author, cancel_event
+            )
+            for strategy, name in strategies
+        }
 
-            # 等待任一任务完成并返回有效结果（使用更短的超时）
-            for future in as_completed([future_web, future_book], timeout=8):  # 减少到8秒
+        # 任一任务返回有效结果即立即返回，不等待落后的策略
+        deadline = search_start + self._search_timeout
+        while pending and not result:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                logger.warning("  ⏰ 并行搜索超时: %ss", self._search_timeout)
+                errors += len(pending)
+                break
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
                 try:
                     temp_result = future.result()
                     if temp_result:
                         result = temp_result
                         elapsed = (time.time() - search_start) * 1000
-                        logger.info(f"  ✅ 并行搜索成功: {result.get('source')} ({elapsed:.2f}ms)")
-                        # 取消其他未完成的任务
+                        logger.info("  ✅ 并行搜索成功: %s (%.2fms)", result.get('source'), elapsed)
                         break
                 except Exception as e:
-                    logger.error(f"  ❌ 搜索策略异常: {e}")
+                    logger.error("  ❌ 搜索策略异常: %s", e)
+                    errors += 1
                     continue
 
-        # 如果并行策略都失败，使用兜底方案
+        # 分离未完成的策略：未开始的直接取消，进行中的收到取消信号后自行退出
+        cancel_event.set()
+        for future in pending:
+            future.cancel()
+
+        # 豆瓣读书页面的结果没有评分和作者等信息，用书籍详情补全（详情按豆瓣ID缓存）
+        if result and self._is_incomplete(result):
+            result = self._enrich_with_detail(result)
+
+        # 所有策略都正常完成但未找到：记入负缓存，兜底结果不写缓存
+        if not result and not errors:
+            logger.info("  🚫 豆瓣未找到，记入负缓存: %s", title)
+            self._negative_cache.add(cache_key)
+            return self._create_fallback_result(title, author, publisher, not_found=True)
+
+        # 后台刷新出错：保留已有的过期条目（兜底结果只在没有任何条目时写入）
+        if not result and refresh and self._get_cache_entry(cache_key) is not None:
+            raise SearchUnavailable(f"所有搜索策略失败: {title}")
+
+        # 如果并行策略因错误失败，使用兜底方案（短TTL缓存，过期后优先重新搜索）
         if not result:
             logger.warning("  ⚠️  所有搜索策略失败，使用兜底方案")
             result = self._create_fallback_result(title, author, publisher)
 
-        # 保存到缓存
+        # 保存到缓存（合并进按豆瓣ID存储的规范记录）
         if result:
-            self._save_to_cache(cache_key, result)
+            result = self._save_result(cache_key, result)
 
-        # 只在明确要求时才获取短评
-        if result and include_comments and result.get('url'):
-            comment_start = time.time()
-            logger.info("  💬 获取短评...")
-            result['short_comments'] = self._get_short_comments(result['url'])
-            comment_time = (time.time() - comment_start) * 1000
-            logger.info(f"  ✅ 短评获取完成: {comment_time:.2f}ms")
+        return result
 
-        total_time = (time.time() - search_start) * 1000
-        logger.info(f"  ⏱️  并行搜索总耗时: {total_time:.2f}ms")
+    def _douban_get(self, url: str, breaker: str, **kwargs):
+        """
+        经过熔断和出站限速的豆瓣请求
 
-        return result
+        Args:
+            breaker: 上游熔断器名称（douban_web / douban_book / douban_subject）
+
+        熔断打开时立即抛出 CircuitOpenError；否则按主机排队获取令牌，
+        并把状态码和耗时反馈给令牌桶（403/429/慢响应/异常时自动降速）和熔断器。
+        """
+        circuit = get_breaker(breaker)
+        if circuit.is_open():
+            raise CircuitOpenError(f"熔断器已打开: {breaker}")
+
+        limiter = douban_rate_limiters.get(url)
+        if not limiter.acquire():
+            raise RateLimitExceeded(f"豆瓣请求排队超时: {url}")
 
-    def _search_douban_web(self, title: str, author: str = None) -> Optional[Dict]:
-        """通过豆瓣搜索页面查找（优化版）"""
+        circuit.check()
+        start = time.time()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception:
+            limiter.record(error=True)
+            circuit.record_failure()
+            raise
+
+        limiter.record(response.status_code, time.time() - start)
+        if is_failure_status(response.status_code):
+            circuit.record_failure()
+        else:
+            circuit.record_success()
+        return response
+
+    @staticmethod
+    def _is_incomplete(result: Dict) -> bool:
+        """结果缺少评分、作者或出版社"""
+        return result.get('rating') is None or not result.get('author') or not result.get('publisher')
+
+    def _enrich_with_detail(self, result: Dict) -> Dict:
+        """用书籍详情补全搜索结果中的空字段"""
+        if not self._parse_subject_id(result.get('url')):
+            return result
+
+        detail = self.get_subject_detail(result['url'])
+        if not detail:
+            return result
+
+        enriched = dict(result)
+        for key in ('title', 'author', 'publisher', 'rating', 'votes', 'publish_year', 'isbn'):
+            if enriched.get(key) in (None, '') and detail.get(key) not in (None, ''):
+                enriched[key] = detail[key]
+        logger.info("  📖 已用书籍详情补全: rating=%s", enriched.get('rating'))
+        return enriched
+
+    def _search_douban_web(self, title: str, author: str = None, cancel_event: threading.Event = None) -> Optional[Dict]:
+        """通过豆瓣搜索页面查找（优化版），cancel_event 置位后放弃重试和解析"""
         try:
             query = title.strip()
             search_url = f"https://www.douban.com/search?cat=1001&q={urllib.parse.quote(query)}"
 
-            print(f"尝试访问: {search_url}")
+            logger.debug("  尝试访问: %s", search_url)
+
+            # 流式模式：只读到前3个完整的结果容器为止
+            streaming = streaming_enabled()
 
             # 优化的重试机制：最多1次重试，快速失败
             max_retries = 1  # 减少到1次重试
             response = None
             for attempt in range(max_retries + 1):
+                if cancel_event and cancel_event.is_set():
+                    return None
                 try:
                     # 第一次尝试用更短的超时
                     timeout = 5 if attempt == 0 else 7  # 5秒或7秒
-                    response = self.session.get(search_url, timeout=timeout)
-                    print(f"响应状态: {response.status_code}")
+                    response = self._douban_get(search_url, breaker='douban_web', timeout=timeout, stream=streaming)
+                    logger.debug("  响应状态: %s", response.status_code)
                     if response.status_code == 200:
                         break
+                    response.close()
+                except CircuitOpenError as e:
+                    logger.warning("  跳过豆瓣搜索: %s", e)
+                    raise SearchUnavailable(str(e))
                 except Exception as e:
-                    print(f"第{attempt + 1}次尝试失败: {e}")
+                    logger.warning("  第%s次尝试失败: %s", attempt + 1, e)
                     if attempt == max_retries:
                         raise
                     time.sleep(0.5)  # 重试等待减少到0.5秒
 
             if not response or response.status_code != 200:
-                print(f"搜索请求失败: {response.status_code if response else 'No response'}")
+                logger.warning("  搜索请求失败: %s", response.status_code if response else 'No response')
+                raise SearchUnavailable(f"豆瓣搜索响应异常: {response.status_code if response else 'No response'}")
+
+            if cancel_event and cancel_event.is_set():
+                response.close()
                 return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            if streaming:
+                book_info, html = self._stream_web_results(response, title, author, cancel_event)
+                if book_info or html is None:
+                    return book_info
+                return self._best_web_candidate(parse_html(html), title, author, html=html)
+
+            html = response.text
 
-            # 多策略查找结果
-            book_info = self._extract_with_multiple_strategies(soup, title, author)
-            if book_info:
-                return book_info
+            # 受限模式：先只构建 div.result 子树排序候选，没有候选满足 is_title_match 时再完整解析
+            if restricted_parsing_enabled():
+                book_info = self._best_web_candidate(parse_html(html, only=WEB_RESULT_STRAINER), title, author,
+                                                     require_title_match=True)
+                if book_info:
+                    return book_info
 
+            return self._best_web_candidate(parse_html(html), title, author, html=html)
+
+        except SearchUnavailable:
+            raise
         except Exception as e:
-            print(f"豆瓣搜索异常: {e}")
+            logger.warning("  豆瓣搜索异常: %s", e)
+            raise SearchUnavailable(f"豆瓣搜索异常: {e}") from e
 
         return None
 
-    def _extract_with_multiple_strategies(self, soup, title: str, author: str = None) -> Optional[Dict]:
-        """使用多种策略提取书籍信息"""
+    def _stream_web_results(self, response, title: str, author: str = None,
+                            cancel_event: threading.Event = None):
+        """
+        流式读取豆瓣搜索页并在前缀上排序标准结果候选
+
+        前缀已包含前3个完整的 div.result（标准结果只看这3个），命中时停止解析页面剩余部分
+        （剩余部分较小时读完丢弃以保留连接，见 StreamedPage.release）；
+        未命中时读完整个页面，再从链接候选和正则兜底中查找。
 
-        # 策略1: 查找标准div.result结构
-        results = soup.find_all('div', class_='result')
-        if results:
-            print(f"策略1: 找到 {len(results)} 个div.result")
-            for result in results[:3]:
-                book_info = self._extract_from_standard_result(result, title)
-                if book_info:
-                    return book_info
+        Returns:
+            (前缀中的最佳候选, 完整页面文本)；命中或被取消时页面文本为None
+        """
+        page = read_until_results(response, WEB_RESULT_CONTAINERS, limit=3, cancel_event=cancel_event)
+        if cancel_event and cancel_event.is_set():
+            page.release()
+            return None, None
+
+        early_exit = not page.complete
+        parse_start = time.perf_counter()
+        book_info = self._best_web_candidate(parse_html(page.text, only=WEB_RESULT_STRAINER), title, author,
+                                             require_title_match=True)
+        parse_ms = (time.perf_counter() - parse_start) * 1000
+
+        if book_info:
+            page.release()
+            stream_stats.record(page, parse_ms, early_exit)
+            logger.info("  📶 流式搜索页: 读取%s字节, 首个候选%.1fms, 解析%.1fms, 提前停止=%s, 保留连接=%s",
+                        len(page.content), page.first_candidate_ms or 0, parse_ms, early_exit,
+                        page.connection_kept)
+            return book_info, None
+
+        html = page.read_rest()
+        stream_stats.record(page, parse_ms, early_exit=False)
+        return None, html
+
+    def _best_web_candidate(self, soup, title: str, author: str = None, html: str = None,
+                            require_title_match: bool = False) -> Optional[Dict]:
+        """
+        豆瓣搜索页：单次遍历收集候选并按相似度排序，返回最佳候选
 
-        # 策略2: 查找所有包含book.douban.com的链接
-        print("策略2: 查找书籍链接")
-        all_links = soup.find_all('a', href=True)
-        book_links = []
-
-        for link in all_links:
-            href = link.get('href', '')
-            text = link.get_text().strip()
-
-            # 检查是否是书籍链接
-            if 'book.douban.com/subject' in href or 'link2' in href:
-                # 检查文本是否包含目标书名
-                if self._text_contains_title(text, title):
-                    book_links.append((link, text, href))
-
-        if book_links:
-            print(f"找到 {len(book_links)} 个潜在书籍链接")
-            for link, text, href in book_links[:3]:
-                book_info = self._extract_from_link_context(link, title, author)
-                if book_info:
-                    return book_info
+        所有候选都不匹配时，若提供了原始HTML且其中包含书名，取第一个书籍链接兜底（regex_match）
 
-        # 策略3: 正则表达式查找
-        print("策略3: 正则表达式查找")
-        page_text = soup.get_text()
-        if title in page_text:
-            # 使用正则查找可能的链接
-            pattern = rf'(https://book\.douban\.com/subject/\d+/)'
-            matches = re.findall(pattern, response.text if hasattr(self, 'response') else str(soup))
-            if matches:
+        Args:
+            require_title_match: 受限解析或页面前缀时为True：没有候选满足 is_title_match
+                （只是相似度达标）时返回None，由调用方完整解析整页，避免错过页面后部更匹配的候选
+        """
+        ranked = self._rank_candidates(title, self._collect_web_candidates(soup), author)
+        if ranked and require_title_match and \
+                not any(is_title_match(title, candidate['title']) for candidate in ranked):
+            return None
+        if ranked:
+            best = ranked[0]
+            if best['source'] == 'link_context':
+                self._fill_link_context(best, author)
+            return self._finalize_candidate(best)
+
+        if html and title in html:
+            match = SUBJECT_URL_PATTERN.search(html)
+            if match:
                 return {
                     'title': title,
                     'author': author or '',
                     'publisher': '',
                     'rating': None,
-                    'url': matches[0],
+                    'url': match.group(1),
                     'source': 'regex_match'
                 }
 
         return None
 
-    def _extract_from_standard_result(self, result_elem, target_title: str) -> Optional[Dict]:
-        """从标准div.result结构提取信息"""
+    def _collect_web_candidates(self, soup) -> List[Dict]:
+        """
+        一次遍历收集豆瓣搜索页的候选
+
+        前3个 div.result 按标准结构提取（source=douban，含评分和作者）；
+        其余指向书籍的链接只取标题和URL（source=link_context），评分等信息在入选后再补全。
+        标准结果排在链接之前，同分时优先
+        """
+        standard, links = [], []
+        seen_urls = set()
+        for elem in soup.find_all(_is_web_candidate_node):
+            if elem.name == 'div':
+                if len(standard) >= 3:
+                    continue
+                candidate = self._standard_result_candidate(elem)
+                if candidate:
+                    standard.append(candidate)
+                    seen_urls.add(candidate['url'])
+                continue
+
+            url = _unwrap_link(elem['href'])
+            if url in seen_urls:
+                continue
+            text = _clean_result_title(elem.get_text(strip=True))
+            if not text:
+                continue
+            seen_urls.add(url)
+            links.append({
+                'title': text,
+                'author': '',
+                'publisher': '',
+                'rating': None,
+                'url': url,
+                'source': 'link_context',
+                '_elem': elem
+            })
+        return standard + links
+
+    def _standard_result_candidate(self, result_elem) -> Optional[Dict]:
+        """从标准 div.result 结构提取候选"""
         try:
             content_div = result_elem.find('div', class_='content')
             if not content_div:
@@ -289,211 +801,184 @@ class DoubanScraper:
             if not title_link:
                 return None
 
-            found_title = title_link.get_text(strip=True)
-            clean_title = found_title.replace('[书籍]', '').strip()
-            clean_title = re.sub(r'\s+', ' ', clean_title)
-
-            if self._is_title_match(target_title, clean_title):
-                link_url = title_link.get('href')
-
-                # 处理跳转链接
-                if link_url and 'link2' in link_url:
-                    match = re.search(r'url=([^&]+)', link_url)
-                    if match:
-                        real_url = urllib.parse.unquote(match.group(1))
-                        link_url = real_url
-
-                # 提取评分和作者信息
-                rating = None
-                author = ''
-                publisher = ''
-
-                rating_div = title_div.find('div', class_='rating-info')
-                if rating_div:
-                    rating_elem = rating_div.find('span', class_='rating_nums')
-                    if rating_elem:
-                        try:
-                            rating = float(rating_elem.get_text(strip=True))
-                        except:
-                            pass
-
-                    subject_cast = rating_div.find('span', class_='subject-cast')
-                    if subject_cast:
-                        cast_text = subject_cast.get_text(strip=True)
-                        parts = [p.strip() for p in cast_text.split('/')]
-                        if len(parts) >= 1:
-                            author = parts[0]
-                        if len(parts) >= 2:
-                            publisher = parts[1]
-
-                return {
-                    'title': clean_title,
-                    'author': author,
-                    'publisher': publisher,
-                    'rating': rating,
-                    'url': link_url or '',
-                    'source': 'douban'
-                }
+            rating = None
+            author = ''
+            publisher = ''
+
+            rating_div = title_div.find('div', class_='rating-info')
+            if rating_div:
+                rating = _parse_rating(rating_div.find('span', class_='rating_nums'))
+                subject_cast = rating_div.find('span', class_='subject-cast')
+                if subject_cast:
+                    author, publisher = _split_cast(subject_cast.get_text(strip=True))
+
+            return {
+                'title': _clean_result_title(title_link.get_text(strip=True)),
+                'author': author,
+                'publisher': publisher,
+                'rating': rating,
+                'url': _unwrap_link(title_link.get('href')) or '',
+                'source': 'douban'
+            }
 
         except Exception as e:
-            print(f"标准结构提取失败: {e}")
+            logger.debug("  标准结构提取失败: %s", e)
 
         return None
 
-    def _extract_from_link_context(self, link, target_title: str, author: str = None) -> Optional[Dict]:
-        """从链接上下文提取信息"""
+    def _fill_link_context(self, candidate: Dict, author: str = None):
+        """为入选的链接候选向上查找评分和作者信息（最多3层父元素）"""
         try:
-            text = link.get_text(strip=True)
-            href = link.get('href')
-
-            # 处理跳转链接
-            if 'link2' in href:
-                match = re.search(r'url=([^&]+)', href)
-                if match:
-                    real_url = urllib.parse.unquote(match.group(1))
-                    href = real_url
-
-            # 清理标题
-            clean_title = text.replace('[书籍]', '').strip()
-
-            if self._is_title_match(target_title, clean_title):
-                # 尝试从父元素获取更多信息
-                rating = None
-                author_info = ''
-                publisher_info = ''
-
-                # 向上查找包含评分的元素
-                parent = link.parent
-                for _ in range(3):
-                    if parent:
-                        rating_elem = parent.find('span', class_='rating_nums')
-                        if rating_elem:
-                            try:
-                                rating = float(rating_elem.get_text(strip=True))
-                                break
-                            except:
-                                pass
-
-                        cast_elem = parent.find('span', class_='subject-cast')
-                        if cast_elem:
-                            cast_text = cast_elem.get_text(strip=True)
-                            parts = [p.strip() for p in cast_text.split('/')]
-                            if len(parts) >= 1:
-                                author_info = parts[0]
-                            if len(parts) >= 2:
-                                publisher_info = parts[1]
-                            break
-
-                        parent = parent.parent
+            parent = candidate['_elem'].parent
+            for _ in range(3):
+                if not parent:
+                    break
+                rating = _parse_rating(parent.find('span', class_='rating_nums'))
+                if rating is not None:
+                    candidate['rating'] = rating
+                    break
 
-                return {
-                    'title': clean_title,
-                    'author': author_info or author or '',
-                    'publisher': publisher_info,
-                    'rating': rating,
-                    'url': href,
-                    'source': 'link_context'
-                }
+                cast_elem = parent.find('span', class_='subject-cast')
+                if cast_elem:
+                    candidate['author'], candidate['publisher'] = _split_cast(cast_elem.get_text(strip=True))
+                    break
 
+                parent = parent.parent
         except Exception as e:
-            print(f"链接上下文提取失败: {e}")
+            logger.debug("  链接上下文提取失败: %s", e)
 
-        return None
+        if not candidate['author']:
+            candidate['author'] = author or ''
+
+    @timed('match')
+    def _rank_candidates(self, title: str, candidates: List[Dict], author: str = None) -> List[Dict]:
+        """两个搜索页共用的候选排序"""
+        return rank_candidates(title, candidates, author)
 
-    def _text_contains_title(self, text: str, title: str) -> bool:
-        """检查文本是否包含标题"""
-        text_clean = text.replace('[书籍]', '').strip().lower()
-        title_clean = title.strip().lower()
-        return title_clean in text_clean or text_clean in title_clean
+    @staticmethod
+    def _finalize_candidate(candidate: Dict) -> Dict:
+        return {key: value for key, value in candidate.items() if not key.startswith('_')}
 
-    def _search_douban_book(self, title: str, author: str = None) -> Optional[Dict]:
-        """通过豆瓣读书页面搜索（优化版）"""
+    def _search_douban_book(self, title: str, author: str = None, cancel_event: threading.Event = None) -> Optional[Dict]:
+        """通过豆瓣读书页面搜索（优化版），cancel_event 置位后放弃重试和解析"""
         try:
             query = urllib.parse.quote(title)
             book_search_url = f"https://book.douban.com/subject_search?search_text={query}"
 
-            print(f"尝试豆瓣读书搜索: {book_search_url}")
+            logger.debug("  尝试豆瓣读书搜索: %s", book_search_url)
+
+            # 流式模式：只读到前3个完整的结果容器为止
+            streaming = streaming_enabled()
 
             # 优化的重试机制：最多1次重试
             max_retries = 1
             for attempt in range(max_retries + 1):
+                if cancel_event and cancel_event.is_set():
+                    return None
                 try:
                     timeout = 5 if attempt == 0 else 7  # 使用更短的超时
-                    response = self.session.get(book_search_url, timeout=timeout)
+                    response = self._douban_get(book_search_url, breaker='douban_book', timeout=timeout,
+                                                stream=streaming)
                     break
+                except CircuitOpenError as e:
+                    logger.warning("  跳过豆瓣读书搜索: %s", e)
+                    raise SearchUnavailable(str(e))
                 except Exception as e:
-                    print(f"豆瓣读书第{attempt + 1}次尝试失败: {e}")
+                    logger.warning("  豆瓣读书第%s次尝试失败: %s", attempt + 1, e)
                     if attempt == max_retries:
                         raise
                     time.sleep(0.5)  # 重试等待减少到0.5秒
 
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                books = soup.find_all('li', class_='subject-item') or soup.find_all('div', class_='pic')
-                print(f"豆瓣读书找到 {len(books)} 个结果")
-
-                for book in books[:3]:
-                    book_info = self._extract_book_detail(book, title)
-                    if book_info:
-                        return book_info
+            if cancel_event and cancel_event.is_set():
+                response.close()
+                return None
 
+            if response.status_code != 200:
+                response.close()
+                raise SearchUnavailable(f"豆瓣读书搜索响应异常: {response.status_code}")
+
+            # 只使用前3个结果，流式模式下读到第3个结果容器闭合即停止（剩余部分较小时读完以保留连接）
+            page = None
+            if streaming:
+                page = read_until_results(response, BOOK_RESULT_CONTAINERS, limit=3, cancel_event=cancel_event)
+                page.release()
+                if cancel_event and cancel_event.is_set():
+                    return None
+                html = page.text
+            else:
+                html = response.text
+
+            parse_start = time.perf_counter()
+            soup = parse_html(html, only=BOOK_RESULT_STRAINER)
+            if page is not None:
+                stream_stats.record(page, (time.perf_counter() - parse_start) * 1000, early_exit=not page.complete)
+
+            ranked = self._rank_candidates(title, self._collect_book_candidates(soup), author)
+            if ranked:
+                return ranked[0]
+
+        except SearchUnavailable:
+            raise
         except Exception as e:
-            print(f"豆瓣读书搜索异常: {e}")
+            logger.warning("  豆瓣读书搜索异常: %s", e)
+            raise SearchUnavailable(f"豆瓣读书搜索异常: {e}") from e
 
         return None
 
-    def _extract_book_detail(self, book_elem, target_title: str) -> Optional[Dict]:
-        """从豆瓣读书页面提取书籍详情"""
+    def _collect_book_candidates(self, soup) -> List[Dict]:
+        """豆瓣读书搜索页：前3个结果条目的候选（标题、URL、评分、作者/出版社）"""
+        books = soup.find_all('li', class_='subject-item') or soup.find_all('div', class_='pic')
+        logger.debug("  豆瓣读书找到 %d 个结果", len(books))
+
+        candidates = []
+        for book in books[:3]:
+            candidate = self._book_item_candidate(book)
+            if candidate:
+                candidates.append(candidate)
+        return candidates
+
+    def _book_item_candidate(self, book_elem) -> Optional[Dict]:
+        """从豆瓣读书搜索结果条目提取候选"""
         try:
-            title_link = book_elem.find('a', href=True)
+            # 标题在 h2 中；第一个链接通常是封面图片，没有文本
+            h2_elem = book_elem.find('h2')
+            title_link = (h2_elem or book_elem).find('a', href=True)
             if not title_link:
                 return None
 
-            found_title = title_link.get_text(strip=True)
-            clean_title = found_title.strip()
-
-            if self._is_title_match(target_title, clean_title):
-                book_url = title_link.get('href', '')
-
-                if book_url and not book_url.startswith('http'):
-                    book_url = 'https://book.douban.com' + book_url
-
-                return {
-                    'title': clean_title,
-                    'author': '',
-                    'publisher': '',
-                    'rating': None,
-                    'url': book_url,
-                    'source': 'douban_book'
-                }
+            found_title = title_link.get('title') or title_link.get_text(strip=True)
+            book_url = title_link.get('href', '')
+            if book_url and not book_url.startswith('http'):
+                book_url = 'https://book.douban.com' + book_url
+
+            author = ''
+            publisher = ''
+            pub_elem = book_elem.find('div', class_='pub')
+            if pub_elem:
+                author, publisher = _split_cast(pub_elem.get_text(strip=True))
+
+            return {
+                'title': found_title.strip(),
+                'author': author,
+                'publisher': publisher,
+                'rating': _parse_rating(book_elem.find('span', class_='rating_nums')),
+                'url': book_url,
+                'source': 'douban_book'
+            }
 
         except Exception as e:
-            print(f"提取豆瓣读书详情失败: {e}")
+            logger.debug("  提取豆瓣读书详情失败: %s", e)
 
         return None
 
-    def _is_title_match(self, search_title: str, found_title: str) -> bool:
-        """判断标题是否匹配"""
-        search_clean = search_title.strip().lower()
-        found_clean = found_title.strip().lower()
-
-        for mark in ['[书籍]', '(豆瓣)', '（豆瓣）']:
-            found_clean = found_clean.replace(mark.lower(), '').strip()
-
-        if search_clean == found_clean:
-            return True
-
-        if search_clean in found_clean or found_clean in search_clean:
-            min_len = min(len(search_clean), len(found_clean))
-            max_len = max(len(search_clean), len(found_clean))
-            if min_len / max_len >= 0.7:
-                return True
-
-        return False
+    def _create_fallback_result(self, title: str, author: str = None, publisher: str = None,
+                                not_found: bool = False) -> Dict:
+        """
+        创建兜底结果，确保总有返回值
 
-    def _create_fallback_result(self, title: str, author: str = None, publisher: str = None) -> Dict:
-        """创建兜底结果，确保总有返回值"""
+        Args:
+            not_found: 豆瓣确认没有这本书（而不是搜索出错）
+        """
         return {
             'title': title,
             'author': author or '',
@@ -501,12 +986,13 @@ class DoubanScraper:
             'rating': None,
             'url': f"https://www.douban.com/search?cat=1001&q={urllib.parse.quote(title)}",
             'source': 'fallback',
-            'note': '豆瓣搜索暂时不可用，已记录书籍信息'
+            'note': '豆瓣未找到该书，已记录书籍信息' if not_found else '豆瓣搜索暂时不可用，已记录书籍信息'
         }
 
+    @timed('comments')
     def _get_short_comments(self, book_url: str, limit: int = 3) -> list:
         """
-        从豆瓣书籍页面获取短评
+        从豆瓣书籍页面获取短评（相同页面的并发请求合并为一次下载）
 
         Args:
             book_url: 豆瓣书籍详情页URL
@@ -515,31 +1001,282 @@ class DoubanScraper:
         Returns:
             短评列表，每条短评包含: content(内容), author(作者), rating(评分), useful_count(有用数)
         """
-        try:
-            print(f"开始获取短评: {book_url}")
+        comments_key = self._get_comments_cache_key(book_url)
+
+        cached = self._get_cache_entry(comments_key)
+        if cached is None:
+            # 相同页面的并发请求合并为一次下载
+            comments, _ = self._inflight.do(comments_key, self._fetch_short_comments, book_url)
+        else:
+            logger.info("  💬 短评缓存命中: %s条", len(cached['comments']))
+            comments = cached['comments']
+
+        return list(comments[:limit])
+
+    @classmethod
+    def _get_comments_cache_key(cls, book_url: str) -> str:
+        """短评缓存键（按豆瓣书籍ID，同一本书的不同URL写法共享缓存）"""
+        subject_id = cls._parse_subject_id(book_url)
+        if subject_id:
+            return f"subject_{subject_id}_comments"
+        return hashlib.md5(f"comments:{book_url.strip()}".encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _save_comments_to_cache(cls, book_url: str, comments: list):
+        """缓存页面上的全部短评，任何不超过页面条数的limit都可直接切片"""
+        cls._save_to_cache(cls._get_comments_cache_key(book_url), {'comments': comments}, ttl=cls._comments_ttl)
 
-            # 确保URL是有效的豆瓣书籍页面
-            if not book_url or 'book.douban.com/subject' not in book_url:
-                print("无效的豆瓣书籍URL")
-                return []
+    def _fetch_short_comments(self, book_url: str) -> list:
+        """通过书籍详情获取页面上的全部短评（详情抓取时已写入短评缓存）"""
+        detail = self.get_subject_detail(book_url)
+        return detail.get('short_comments', []) if detail else []
+
+    def get_subject_detail(self, book_url: str) -> Optional[Dict]:
+        """
+        获取书籍详情：详情页只下载一次，一次解析出全部字段，按豆瓣ID缓存
+
+        Returns:
+            包含 title, author, publisher, publish_year, isbn, pages, rating, votes,
+            intro, short_comments, url, subject_id 的字典；URL无效或抓取失败时返回None
+        """
+        subject_id = self._parse_subject_id(book_url)
+        if not subject_id:
+            logger.warning("  无效的豆瓣书籍URL: %s", book_url)
+            return None
+
+        detail_key = f"subject_{subject_id}_detail"
+        cached = self._get_cache_entry(detail_key)
+        if cached is not None and time.time() - cached.get('_cached_at', 0) < self._detail_ttl:
+            logger.info("  📖 书籍详情缓存命中: %s", subject_id)
+            return {k: v for k, v in cached.items() if not k.startswith('_')}
+
+        # 相同书籍的并发请求合并为一次下载（有保留的过期详情时发条件请求）
+        detail, _ = self._inflight.do(detail_key, self._fetch_subject_detail, subject_id)
+        if detail:
+            return dict(detail)
+
+        # 抓取失败时退回保留的过期详情
+        if cached is not None:
+            logger.info("  📖 书籍详情抓取失败，使用过期缓存: %s", subject_id)
+            return {k: v for k, v in cached.items() if not k.startswith('_')}
+        return None
+
+    @timed('subject_detail')
+    def _fetch_subject_detail(self, subject_id: str) -> Optional[Dict]:
+        """
+        下载并解析书籍详情页，写入详情缓存、短评缓存和规范书籍记录
+
+        保留的过期详情带有 ETag / Last-Modified 时发送条件请求，
+        豆瓣返回304则直接复用已解析的详情，不再下载和解析页面。
+        """
+        book_url = f"https://book.douban.com/subject/{subject_id}/"
+        cached = self._get_cache_entry(f"subject_{subject_id}_detail")
+        headers = validator_headers(cached.get('_etag'), cached.get('_last_modified')) if cached else {}
+        try:
+            logger.debug("  开始获取书籍详情: %s", book_url)
 
             # 请求书籍详情页
-            response = self.session.get(book_url, timeout=15)
+            response = self._douban_get(book_url, breaker='douban_subject', timeout=15, headers=headers)
+            self._revalidation.record(response.status_code, len(response.content), bool(headers),
+                                      cached.get('_body_bytes', 0) if cached else 0)
+
+            if response.status_code == 304 and cached:
+                logger.info("  ♻️  书籍详情未修改(304)，复用缓存: %s", subject_id)
+                detail = {k: v for k, v in cached.items() if not k.startswith('_')}
+                return self._store_subject_detail(subject_id, detail, cached)
+
+            if response.status_code != 200:
+                logger.warning("  获取书籍页面失败: %s", response.status_code)
+                return None
+
+            return self._process_subject_page(subject_id, response.text, response)
+        except Exception as e:
+            logger.warning("  获取书籍详情失败: %s", e)
+            return None
+
+    def _process_subject_page(self, subject_id: str, html: str, response=None) -> Dict:
+        """解析书籍详情页，写入详情缓存、短评缓存和规范书籍记录（response 用于保存校验器）"""
+        book_url = f"https://book.douban.com/subject/{subject_id}/"
+        detail = self._parse_subject_detail(parse_html(html), book_url)
+        detail['subject_id'] = subject_id
+
+        validators = {}
+        if response is not None:
+            validators = {
+                '_etag': response.headers.get('ETag'),
+                '_last_modified': response.headers.get('Last-Modified'),
+                '_body_bytes': len(response.content)
+            }
+        return self._store_subject_detail(subject_id, detail, validators)
+
+    def _store_subject_detail(self, subject_id: str, detail: Dict, validators: Dict) -> Dict:
+        """保存详情（连同校验器保留到 _detail_keep_ttl）、短评缓存和规范书籍记录"""
+        book_url = f"https://book.douban.com/subject/{subject_id}/"
+        entry = dict(detail)
+        for key in ('_etag', '_last_modified', '_body_bytes'):
+            if validators.get(key):
+                entry[key] = validators[key]
+        self._save_to_cache(f"subject_{subject_id}_detail", entry, ttl=self._detail_keep_ttl)
+        self._save_comments_to_cache(book_url, detail['short_comments'])
+        self._merge_subject(subject_id, {k: v for k, v in detail.items() if k != 'short_comments'})
+        return detail
+
+    @staticmethod
+    def _normalize_isbn(isbn: str) -> Optional[str]:
+        """规范化ISBN（去除连字符和空格），不是10位或13位ISBN时返回None"""
+        if not isbn:
+            return None
+        clean = re.sub(r'[\s-]', '', str(isbn)).upper()
+        if re.fullmatch(r'\d{13}|\d{9}[\dX]', clean):
+            return clean
+        return None
+
+    def lookup_isbn(self, isbn: str, include_comments: bool = False) -> Optional[Dict]:
+        """
+        按ISBN直接定位豆瓣书籍（book.douban.com/isbn/<isbn>/ 会跳转到详情页），
+        无需解析搜索页；ISBN作为别名指向按豆瓣ID存储的规范记录
+
+        Args:
+            isbn: 10位或13位ISBN，可带连字符
+            include_comments: 是否包含短评
+        """
+        lookup_start = time.time()
+        clean_isbn = self._normalize_isbn(isbn)
+        if not clean_isbn:
+            return None
+
+        isbn_key = f"isbn_{clean_isbn}"
+        result = self._get_from_cache(isbn_key, allow_stale=True)
+        if result:
+            # 与书名查询一致：过期条目先返回，后台重新下载详情页
+            if result.pop('_cache', {}).get('status') == 'stale':
+                self._schedule_refresh(isbn_key, functools.partial(self._refresh_isbn, clean_isbn))
+            logger.info("  💾 ISBN缓存命中: %s", clean_isbn)
+        else:
+            # 相同ISBN的并发请求合并为一次下载
+            try:
+                detail, _ = self._inflight.do(isbn_key, self._fetch_isbn, clean_isbn)
+            except SearchUnavailable:
+                # 合并到了失败的后台刷新
+                detail = None
+            if not detail:
+                return None
+            result = {k: v for k, v in (self._get_subject(detail['subject_id']) or detail).items() if k != 'short_comments'}
+
+        result['source'] = 'douban_isbn'
+        if include_comments and result.get('url'):
+            result['short_comments'] = self._get_short_comments(result['url'])
+
+        total_time = (time.time() - lookup_start) * 1000
+        logger.info("  ⏱️  ISBN查询总耗时: %.2fms", total_time)
+        return result
+
+    def _refresh_isbn(self, isbn: str) -> Dict:
+        """后台刷新ISBN条目；抓取失败时不改动已有条目，抛出 SearchUnavailable 由刷新任务重试"""
+        detail = self._fetch_isbn(isbn)
+        if not detail:
+            raise SearchUnavailable(f"ISBN查询失败: {isbn}")
+        return detail
+
+    @timed('douban_isbn')
+    def _fetch_isbn(self, isbn: str) -> Optional[Dict]:
+        """请求ISBN跳转页，解析最终到达的书籍详情页"""
+        isbn_url = f"https://book.douban.com/isbn/{isbn}/"
+        try:
+            logger.debug("  尝试ISBN查询: %s", isbn_url)
+            response = self._douban_get(isbn_url, breaker='douban_subject', timeout=10)
             if response.status_code != 200:
-                print(f"获取书籍页面失败: {response.status_code}")
-                return []
+                logger.warning("  ISBN查询失败: %s", response.status_code)
+                return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            comments = []
+            subject_id = self._parse_subject_id(response.url)
+            if not subject_id:
+                logger.info("  ISBN未跳转到书籍页面: %s", response.url)
+                return None
 
+            detail = self._process_subject_page(subject_id, response.text, response)
+        except Exception as e:
+            logger.warning("  ISBN查询异常: %s", e)
+            return None
+
+        self._save_to_cache(f"isbn_{isbn}", {'_subject_id': subject_id})
+        return detail
+
+    def _parse_subject_detail(self, soup, book_url: str) -> Dict:
+        """从书籍详情页解析全部字段"""
+        detail = {
+            'title': '',
+            'author': '',
+            'publisher': '',
+            'publish_year': None,
+            'isbn': None,
+            'pages': None,
+            'rating': None,
+            'votes': None,
+            'intro': '',
+            'url': book_url
+        }
+
+        title_elem = soup.find('span', property='v:itemreviewed')
+        if title_elem:
+            detail['title'] = title_elem.get_text(strip=True)
+
+        # 评分与评价人数
+        rating_elem = soup.find('strong', property='v:average') or \
+                     soup.find('strong', class_='rating_num')
+        if rating_elem:
+            try:
+                detail['rating'] = float(rating_elem.get_text(strip=True))
+            except ValueError:
+                pass  # 暂无评分
+
+        votes_elem = soup.find('span', property='v:votes')
+        if votes_elem:
+            try:
+                detail['votes'] = int(votes_elem.get_text(strip=True))
+            except ValueError:
+                pass
+
+        # 基本信息：<span class="pl">标签</span> 后到 <br> 之前为取值
+        info_elem = soup.find('div', id='info')
+        if info_elem:
+            fields = {'作者': 'author', '出版社': 'publisher', '出版年': 'publish_year', '页数': 'pages', 'ISBN': 'isbn'}
+            for label_elem in info_elem.find_all('span', class_='pl'):
+                label = label_elem.get_text(strip=True).rstrip(':：').strip()
+                if label not in fields:
+                    continue
+
+                parts = []
+                for sibling in label_elem.next_siblings:
+                    if getattr(sibling, 'name', None) == 'br':
+                        break
+                    parts.append(sibling.get_text() if hasattr(sibling, 'get_text') else str(sibling))
+                value = re.sub(r'\s+', ' ', ''.join(parts)).strip().lstrip(':：').strip()
+                if value:
+                    detail[fields[label]] = value
+            detail['publish_year'] = parse_year(detail['publish_year'])
+
+        # 简介：折叠时完整内容在 span.all 中
+        intro_elem = soup.select_one('#link-report span.all .intro') or soup.find('div', class_='intro')
+        if intro_elem:
+            detail['intro'] = intro_elem.get_text('\n', strip=True)
+
+        detail['short_comments'] = self._parse_short_comments(soup)
+        return detail
+
+    def _parse_short_comments(self, soup) -> list:
+        """从书籍页面解析全部短评"""
+        comments = []
+
+        try:
             # 查找短评区域 - 豆瓣的短评通常在 id="comments-section" 或 class="comment-item"
             comment_items = soup.find_all('div', class_='comment-item') or \
                            soup.find_all('li', class_='comment-item') or \
                            soup.find_all('div', class_='comment')
 
-            print(f"找到 {len(comment_items)} 条评论")
+            logger.debug("  找到 %d 条评论", len(comment_items))
 
-            for item in comment_items[:limit]:
+            for item in comment_items:
                 try:
                     # 提取评论内容
                     comment_content = None
@@ -592,12 +1329,12 @@ class DoubanScraper:
                     })
 
                 except Exception as e:
-                    print(f"解析单条评论失败: {e}")
+                    logger.debug("  解析单条评论失败: %s", e)
                     continue
 
-            print(f"成功提取 {len(comments)} 条短评")
-            return comments
+            logger.debug("  成功提取 %d 条短评", len(comments))
 
         except Exception as e:
-            print(f"获取短评失败: {e}")
-            return []
\ No newline at end of file
+            logger.warning("  解析短评失败: %s", e)
+
+        return comments
\ No newline at end of file
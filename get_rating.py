@@ -3,9 +3,7 @@
 获取《直抵人心的写作》的豆瓣评分
 """
 
-import requests
-from bs4 import BeautifulSoup
-import time
+from douban_scraper import DoubanScraper
 
 
 def get_book_rating():
@@ -13,65 +11,31 @@ def get_book_rating():
     # 从搜索结果中得到的书籍链接
     book_url = "https://book.douban.com/subject/36618956/"
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        'Accept-Language': 'zh-CN,zh;q=0.9',
-    }
-
     print("=" * 60)
     print("📚 《直抵人心的写作》豆瓣信息查询")
     print("=" * 60)
 
     try:
-        response = requests.get(book_url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # 与API服务共用详情抓取：一次下载解析全部字段，并按豆瓣ID缓存
+        detail = DoubanScraper().get_subject_detail(book_url)
+        if not detail:
+            print("获取书籍详情失败")
+            return None
 
-        # 提取书籍信息
         result = {
-            'title': '直抵人心的写作',
-            'url': book_url
+            'title': detail.get('title') or '直抵人心的写作',
+            'url': book_url,
+            'rating': str(detail['rating']) if detail.get('rating') is not None else '暂无评分'
         }
-
-        # 提取评分
-        rating_elem = soup.find('strong', class_='ll rating_num') or \
-                     soup.find('strong', property='v:average')
-        if rating_elem:
-            result['rating'] = rating_elem.text.strip()
-        else:
-            # 可能暂无评分
-            no_rating = soup.find('div', class_='rating_sum')
-            if no_rating and '暂无' in no_rating.text:
-                result['rating'] = '暂无评分'
-
-        # 提取评价人数
-        rating_people = soup.find('span', property='v:votes')
-        if rating_people:
-            result['rating_people'] = rating_people.text.strip()
-
-        # 提取详细信息
-        info_elem = soup.find('div', id='info')
-        if info_elem:
-            info_text = info_elem.text
-            lines = info_text.split('\n')
-            for line in lines:
-                if '作者' in line:
-                    result['author'] = line.split(':')[-1].strip()
-                elif '出版社' in line:
-                    result['publisher'] = line.split(':')[-1].strip()
-                elif '出版年' in line:
-                    result['publish_year'] = line.split(':')[-1].strip()
-                elif '页数' in line:
-                    result['pages'] = line.split(':')[-1].strip()
-                elif 'ISBN' in line:
-                    result['isbn'] = line.split(':')[-1].strip()
+        if detail.get('votes') is not None:
+            result['rating_people'] = str(detail['votes'])
+        for key in ('author', 'publisher', 'publish_year', 'pages', 'isbn'):
+            if detail.get(key):
+                result[key] = detail[key]
 
         # 提取简介
-        intro_elem = soup.find('div', class_='intro')
-        if intro_elem:
-            intro_text = intro_elem.text.strip()
+        intro_text = detail.get('intro', '')
+        if intro_text:
             result['intro'] = intro_text[:200] + '...' if len(intro_text) > 200 else intro_text
 
         # 显示结果
@@ -97,8 +61,6 @@ def get_book_rating():
 
         return result
 
-    except requests.exceptions.RequestException as e:
-        print(f"网络请求错误: {e}")
     except Exception as e:
         print(f"解析错误: {e}")
 
@@ -0,0 +1,52 @@
+"""
+Gunicorn 生产配置（协作式I/O）
+
+    gunicorn -c gunicorn.conf.py api_server:app
+
+默认使用 gevent worker：等待豆瓣 / VLM 响应时让出协程而不占用线程，
+每个进程可同时挂起 worker_connections 个请求。接口、请求和响应格式与
+`python api_server.py` 完全相同。
+
+环境变量:
+    GUNICORN_BIND: 监听地址（默认 127.0.0.1:5000）
+    GUNICORN_WORKERS: 进程数（默认2）
+    GUNICORN_WORKER_CLASS: gevent（默认）/ sync / gthread
+    GUNICORN_WORKER_CONNECTIONS: gevent 模式下每进程的并发请求上限（默认2000）
+    GUNICORN_THREADS: gthread 模式下每进程的线程数（默认8）
+
+不预加载应用（preload_app = False）：api_server 在导入时就启动日志后台线程
+（logging_setup 的 QueueListener），并创建搜索线程池 _search_executor 和后台刷新池
+_refresh_pool。预加载时这些对象在 master 进程中创建，fork 出的 worker 只继承对象、
+不继承线程（日志监听线程需在子进程重启，线程池里的锁和队列状态也随 fork 复制），
+因此每个 worker 各自导入应用，在本进程内创建这些线程。
+"""
+import os
+
+from dotenv import load_dotenv
+
+# 与 api_server 一致读取 .env（GUNICORN_* 以及下方的默认值都可在 .env 中覆盖）
+load_dotenv()
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 2000))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+max_requests = 1000
+max_requests_jitter = 100
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+backlog = 2048
+
+# 各 worker 自行导入应用（见模块说明）；gevent worker 还需在导入 requests / ssl / threading
+# 之前打 monkey patch，预加载会让连接池、锁和线程池无法协作切换
+preload_app = False
+
+if worker_class == 'gevent':
+    # 协程模式下进程内的"线程池"实际是协程，上限按并发请求数放大
+    # （每个搜索占2个，落后的策略在HTTP请求结束前仍占用一个）
+    os.environ.setdefault('DOUBAN_SEARCH_WORKERS', str(worker_connections * 2))
+    os.environ.setdefault('DOUBAN_REFRESH_WORKERS', '16')
+    # 每个上游主机的keep-alive连接上限与并发请求数一致，避免高并发时连接用完即关、反复建连
+    os.environ.setdefault('HTTP_POOL_MAXSIZE', str(worker_connections))
@@ -0,0 +1,313 @@
+"""
+HTML解析后端
+统一豆瓣页面的 BeautifulSoup 构建方式：
+- DOUBAN_HTML_PARSER: lxml（默认，未安装时回退到 html.parser）/ html.parser / html5lib
+- DOUBAN_PARSE_RESTRICTED: 1（默认）时搜索页只构建结果容器子树（div.result、li.subject-item 等）
+- DOUBAN_SEARCH_STREAMING: 1 时搜索页流式下载，增量扫描到足够的结果容器后提前停止读取（默认0）。
+  提前停止时未读的剩余部分不超过 DOUBAN_STREAM_DRAIN_BYTES（默认64KB）则读完丢弃，连接放回连接池；
+  超过则关闭连接，下一次请求要重新TCP+TLS握手，因此只在页面很大、握手很便宜时才值得开启
+"""
+import logging
+import os
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# 各页面的结果容器，受限模式下只构建这些子树
+WEB_RESULT_STRAINER = SoupStrainer('div', class_='result')
+BOOK_RESULT_STRAINER = SoupStrainer(['li', 'div'], class_=['subject-item', 'pic'])
+
+# 流式扫描用的结果容器 (标签, class)，按优先级排列（与提取代码的 find_all 顺序一致）
+WEB_RESULT_CONTAINERS = (('div', 'result'),)
+BOOK_RESULT_CONTAINERS = (('li', 'subject-item'), ('div', 'pic'))
+
+_backend = None
+
+
+def get_parser_backend() -> str:
+    """返回当前使用的解析器名称（首次调用时按配置解析并校验是否可用）"""
+    global _backend
+    if _backend is None:
+        configured = os.getenv('DOUBAN_HTML_PARSER', 'lxml')
+        if builder_registry.lookup(configured) is None:
+            logger.warning("HTML解析器 %s 不可用，回退到 html.parser", configured)
+            configured = 'html.parser'
+        _backend = configured
+    return _backend
+
+
+def restricted_parsing_enabled() -> bool:
+    """是否启用受限树模式"""
+    return os.getenv('DOUBAN_PARSE_RESTRICTED', '1') == '1'
+
+
+def parse_html(markup, only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """
+    使用配置的后端解析HTML
+
+    Args:
+        markup: HTML文本或字节
+        only: 结果容器过滤器；受限模式开启时只构建匹配的子树，关闭时忽略
+    """
+    with stage('parse'):
+        if only is not None and restricted_parsing_enabled():
+            return BeautifulSoup(markup, get_parser_backend(), parse_only=only)
+        return BeautifulSoup(markup, get_parser_backend())
+
+
+def streaming_enabled() -> bool:
+    """是否启用搜索页流式提前停止（默认关闭：提前关闭连接会丢掉keep-alive连接）"""
+    return os.getenv('DOUBAN_SEARCH_STREAMING', '0') == '1'
+
+
+def stream_drain_limit() -> int:
+    """提前停止后为保留连接最多再读取的字节数"""
+    return int(os.getenv('DOUBAN_STREAM_DRAIN_BYTES', 65536))
+
+
+class _StdlibContainerScanner(HTMLParser):
+    """未安装lxml时的增量扫描器：用同名标签的嵌套深度判断结果容器是否已闭合"""
+
+    def __init__(self, scanner: 'ResultContainerScanner'):
+        super().__init__(convert_charrefs=False)
+        self.scanner = scanner
+        self._open = []  # 每个未闭合容器: [容器序号, 标签, 同名标签嵌套深度]
+
+    def handle_starttag(self, tag, attrs):
+        for item in self._open:
+            if item[1] == tag:
+                item[2] += 1
+        index = self.scanner.match(tag, dict(attrs).get('class'))
+        if index is not None:
+            self._open.append([index, tag, 1])
+            self.scanner.seen[index] += 1
+
+    def handle_endtag(self, tag):
+        for item in list(self._open):
+            if item[1] == tag:
+                item[2] -= 1
+                if item[2] == 0:
+                    self._open.remove(item)
+                    self.scanner.closed[item[0]] += 1
+
+
+class ResultContainerScanner:
+    """
+    增量统计已完整下载的结果容器数（lxml 使用 HTMLPullParser，否则使用标准库 HTMLParser）
+
+    与提取代码的 find_all 用法一致：按 containers 的顺序取第一个出现过的容器类型计数
+    （如豆瓣读书页面优先 li.subject-item，没有时才用 div.pic）。
+    """
+
+    def __init__(self, containers: Sequence[Tuple[str, str]]):
+        self.containers = containers
+        self.seen = [0] * len(containers)
+        self.closed = [0] * len(containers)
+        if get_parser_backend() == 'lxml':
+            from lxml import etree
+            self._pull = etree.HTMLPullParser(events=('start', 'end'))
+            self._stdlib = None
+        else:
+            self._pull = None
+            self._stdlib = _StdlibContainerScanner(self)
+
+    def match(self, tag, class_attr: Optional[str]) -> Optional[int]:
+        """标签是否为结果容器，返回容器序号"""
+        if not class_attr:
+            return None
+        classes = class_attr.split()
+        for index, (container_tag, container_class) in enumerate(self.containers):
+            if tag == container_tag and container_class in classes:
+                return index
+        return None
+
+    def feed(self, chunk: bytes) -> int:
+        """喂入一段数据，返回当前已闭合的容器数"""
+        if self._pull is None:
+            self._stdlib.feed(chunk.decode('utf-8', errors='ignore'))
+            return self.completed()
+
+        self._pull.feed(chunk)
+        for event, element in self._pull.read_events():
+            if not isinstance(element.tag, str):
+                continue
+            index = self.match(element.tag, element.get('class'))
+            if index is None:
+                continue
+            if event == 'start':
+                self.seen[index] += 1
+            else:
+                self.closed[index] += 1
+        return self.completed()
+
+    def completed(self) -> int:
+        for seen, closed in zip(self.seen, self.closed):
+            if seen:
+                return closed
+        return 0
+
+
+class StreamedPage:
+    """流式读取的搜索页：content 为已读取的前缀，complete 表示是否读到了结尾"""
+
+    def __init__(self, response, chunks: Iterable[bytes], content: bytes, complete: bool,
+                 first_candidate_at: Optional[float], started_at: float):
+        self.response = response
+        self._chunks = chunks
+        self.content = content
+        self.complete = complete
+        self.first_candidate_ms = (first_candidate_at - started_at) * 1000 if first_candidate_at else None
+        self.drained_bytes = 0
+        self.connection_kept = None  # release() 之后：连接是否放回连接池
+
+    @property
+    def encoding(self) -> str:
+        return self.response.encoding or 'utf-8'
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors='replace')
+
+    def read_rest(self) -> str:
+        """继续读取剩余内容（前缀不足以找到结果时），返回完整页面文本"""
+        if not self.complete:
+            self.content += b''.join(self._chunks)
+            self.complete = True
+            self.close()
+        return self.text
+
+    def transferred_bytes(self) -> int:
+        """从连接读取的原始字节数（压缩后），无法获取时为解压后的字节数"""
+        raw = getattr(self.response, 'raw', None)
+        try:
+            return int(raw.tell())
+        except Exception:
+            return len(self.content)
+
+    def _remaining_bytes(self) -> Optional[int]:
+        """按 Content-Length 计算连接上尚未读取的字节数，未知时返回None"""
+        length = self.response.headers.get('Content-Length')
+        raw = getattr(self.response, 'raw', None)
+        try:
+            return int(length) - int(raw.tell())
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+    def release(self, drain_limit: int = None) -> bool:
+        """
+        结束读取
+
+        未读的剩余部分不超过 drain_limit 字节时读完丢弃，连接放回连接池；否则关闭连接
+        （连接被丢弃，下一次请求需重新建立TCP+TLS连接）。
+
+        Returns:
+            连接是否放回连接池
+        """
+        if drain_limit is None:
+            drain_limit = stream_drain_limit()
+
+        if not self.complete:
+            remaining = self._remaining_bytes()
+            if remaining is not None and remaining > drain_limit:
+                return self._close(kept=False)
+            for chunk in self._chunks:
+                self.drained_bytes += len(chunk)
+                if self.drained_bytes > drain_limit:
+                    return self._close(kept=False)
+
+        # 响应体已读完，requests 关闭响应时把连接放回连接池
+        return self._close(kept=True)
+
+    def _close(self, kept: bool) -> bool:
+        self.response.close()
+        self.connection_kept = kept
+        return kept
+
+    def close(self):
+        self.response.close()
+
+
+def read_until_results(response, containers: Sequence[Tuple[str, str]], limit: int,
+                       cancel_event: threading.Event = None, chunk_size: int = 8192) -> StreamedPage:
+    """
+    流式读取响应，直到已完整下载 limit 个结果容器或读到结尾
+
+    提前停止时连接未读完，调用 StreamedPage.release() 读完较小的剩余部分以保留连接，
+    剩余部分较大时连接被关闭、不会放回连接池。
+    """
+    started_at = time.perf_counter()
+    scanner = ResultContainerScanner(containers)
+    chunks = response.iter_content(chunk_size=chunk_size)
+    buffer = bytearray()
+    first_candidate_at = None
+
+    for chunk in chunks:
+        buffer += chunk
+        completed = scanner.feed(chunk)
+        if completed and first_candidate_at is None:
+            first_candidate_at = time.perf_counter()
+        if completed >= limit or (cancel_event and cancel_event.is_set()):
+            return StreamedPage(response, chunks, bytes(buffer), False, first_candidate_at, started_at)
+
+    return StreamedPage(response, chunks, bytes(buffer), True, first_candidate_at, started_at)
+
+
+class StreamStats:
+    """流式搜索页读取的统计（读取字节数、提前停止次数、首个候选耗时、解析耗时）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.early_exits = 0
+        self.bytes_read = 0
+        self.bytes_transferred = 0
+        self.first_candidate_ms = 0.0
+        self.first_candidate_pages = 0
+        self.parse_ms = 0.0
+        self.drained_bytes = 0
+        self.connections_kept = 0
+        self.connections_dropped = 0
+
+    def record(self, page: StreamedPage, parse_ms: float, early_exit: bool):
+        with self._lock:
+            self.pages += 1
+            self.early_exits += 1 if early_exit else 0
+            self.bytes_read += len(page.content)
+            self.bytes_transferred += page.transferred_bytes()
+            self.parse_ms += parse_ms
+            self.drained_bytes += page.drained_bytes
+            if early_exit and page.connection_kept is not None:
+                if page.connection_kept:
+                    self.connections_kept += 1
+                else:
+                    self.connections_dropped += 1
+            if page.first_candidate_ms is not None:
+                self.first_candidate_ms += page.first_candidate_ms
+                self.first_candidate_pages += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pages = self.pages or 1
+            return {
+                'pages': self.pages,
+                'early_exits': self.early_exits,
+                'bytes_read': self.bytes_read,
+                'bytes_transferred': self.bytes_transferred,
+                'avg_first_candidate_ms': round(self.first_candidate_ms / (self.first_candidate_pages or 1), 2),
+                'avg_parse_ms': round(self.parse_ms / pages, 2),
+                # 提前停止后：读完剩余部分保留的连接 / 被关闭的连接（后者每次都要重新握手）
+                'drained_bytes': self.drained_bytes,
+                'connections_kept': self.connections_kept,
+                'connections_dropped': self.connections_dropped
+            }
+
+
+stream_stats = StreamStats()
@@ -0,0 +1,251 @@
+"""
+进程级共享HTTP客户端
+按主机维护连接池（每个主机一个 requests.Session），在请求之间复用TCP/TLS连接。
+DoubanScraper、BookAPI、BookInfoExtractor 均通过这里发起请求。
+
+HTTP_UPSTREAM_OVERRIDE=http://127.0.0.1:8900 时所有上游请求改发到本地回放服务
+（benchmarks/stub_server.py），原始主机放在 X-Upstream-Host 请求头中。
+"""
+import os
+import threading
+import urllib.parse
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class UpstreamOverrideAdapter(HTTPAdapter):
+    """把请求改发到固定的服务地址（保留路径和查询串），响应的 url 仍为原始URL，重定向同样经过改写"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        parts = urllib.parse.urlsplit(original_url)
+        request.url = self.base_url + (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        request.headers['X-Upstream-Host'] = parts.netloc
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            request.url = original_url
+        response.url = original_url
+        return response
+
+
+class ConnectCounter:
+    """线程安全的连接建立计数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def increment(self):
+        with self._lock:
+            self.count += 1
+
+
+def count_connects(adapter: HTTPAdapter) -> ConnectCounter:
+    """
+    统计适配器实际建立的TCP(+TLS)连接数
+
+    把连接池的连接类替换为在 connect() 时计数的子类。连接池的 num_connections
+    只统计新建的连接对象，断开后在同一对象上重连不会计入，这里每次 connect() 都计数。
+    """
+    counter = ConnectCounter()
+    pool_classes = {}
+    for scheme, pool_cls in adapter.poolmanager.pool_classes_by_scheme.items():
+        conn_cls = pool_cls.ConnectionCls
+
+        def connect(self, _base=conn_cls):
+            counter.increment()
+            return _base.connect(self)
+
+        counting_conn_cls = type(f'Counting{conn_cls.__name__}', (conn_cls,), {'connect': connect})
+        pool_classes[scheme] = type(f'Counting{pool_cls.__name__}', (pool_cls,), {'ConnectionCls': counting_conn_cls})
+    adapter.poolmanager.pool_classes_by_scheme = pool_classes
+    return counter
+
+
+class HTTPClientRegistry:
+    """线程安全的按主机连接池注册表"""
+
+    def __init__(self, pool_maxsize: int = 20, pool_block: bool = False, adapter_factory=None):
+        """
+        Args:
+            pool_maxsize: 每个主机保持的最大keep-alive连接数
+            pool_block: 连接池用尽时是否阻塞等待（否则临时新建连接）
+            adapter_factory: 创建传输适配器的可调用对象（接收 HTTPAdapter 的参数），
+                用于改发或录制请求；只影响之后新建的Session
+        """
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.adapter_factory = adapter_factory or HTTPAdapter
+        self._sessions: Dict[str, requests.Session] = {}
+        self._connects: Dict[str, ConnectCounter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parsed = urllib.parse.urlsplit(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def _create_session(self, host: str) -> requests.Session:
+        session = requests.Session()
+        adapter = self.adapter_factory(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block
+        )
+        self._connects[host] = count_connects(adapter)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, url: str) -> requests.Session:
+        """获取URL所属主机的共享Session"""
+        host = self._host_key(url)
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._create_session(host)
+                    self._sessions[host] = session
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def close(self):
+        """关闭所有连接池（之后的请求会重新建立连接）"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._connects.clear()
+        for session in sessions:
+            session.close()
+
+    def stats(self) -> Dict:
+        """
+        每个主机的连接复用统计
+
+        new_connections: 实际建立的TCP(+TLS)连接数（每次 connect() 计数，包括连接断开后的重连）
+        reused: 复用已有连接完成的请求数
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+            connects = dict(self._connects)
+
+        hosts = {}
+        for host, session in sessions.items():
+            adapter = session.get_adapter(host + '/')
+            requests_count = 0
+            for pool_key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(pool_key)
+                if pool is None:
+                    continue
+                requests_count += pool.num_requests
+            counter = connects.get(host)
+            connections = counter.count if counter else 0
+            hosts[host] = {
+                'requests': requests_count,
+                'new_connections': connections,
+                'reused': max(requests_count - connections, 0),
+                'reuse_ratio': round(1 - connections / requests_count, 4) if requests_count else 0.0
+            }
+
+        return {
+            'pool_maxsize': self.pool_maxsize,
+            'hosts': hosts
+        }
+
+
+class PooledClient:
+    """带默认请求头的客户端视图，底层连接池在进程内共享"""
+
+    def __init__(self, headers: Optional[Dict] = None, registry: HTTPClientRegistry = None):
+        self.headers = dict(headers or {})
+        self.registry = registry or default_registry
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, **kwargs) -> requests.Response:
+        merged_headers = dict(self.headers)
+        if headers:
+            merged_headers.update(headers)
+        return self.registry.request(method, url, headers=merged_headers, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+
+class RevalidationStats:
+    """条件请求（If-None-Match / If-Modified-Since）统计：304命中率和节省的字节数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.conditional = 0
+        self.not_modified = 0
+        self.full_downloads = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    def record(self, status_code: int, body_bytes: int, conditional: bool, cached_bytes: int = 0):
+        """
+        Args:
+            body_bytes: 本次响应体字节数
+            conditional: 是否带了校验器
+            cached_bytes: 304 时缓存页面的字节数（即节省的下载量）
+        """
+        with self._lock:
+            self.conditional += 1 if conditional else 0
+            self.bytes_downloaded += body_bytes
+            if status_code == 304:
+                self.not_modified += 1
+                self.bytes_saved += cached_bytes
+            else:
+                self.full_downloads += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'conditional_requests': self.conditional,
+                'not_modified': self.not_modified,
+                'full_downloads': self.full_downloads,
+                'not_modified_ratio': round(self.not_modified / self.conditional, 4) if self.conditional else 0.0,
+                'bytes_downloaded': self.bytes_downloaded,
+                'bytes_saved': self.bytes_saved
+            }
+
+
+def validator_headers(etag: Optional[str], last_modified: Optional[str]) -> Dict:
+    """根据缓存的 ETag / Last-Modified 生成条件请求头"""
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def _default_adapter_factory():
+    override = os.getenv('HTTP_UPSTREAM_OVERRIDE')
+    if override:
+        return lambda **kwargs: UpstreamOverrideAdapter(override, **kwargs)
+    return HTTPAdapter
+
+
+default_registry = HTTPClientRegistry(
+    pool_maxsize=int(os.getenv('HTTP_POOL_MAXSIZE', 20)),
+    pool_block=os.getenv('HTTP_POOL_BLOCK', '0') == '1',
+    adapter_factory=_default_adapter_factory()
+)
+
+
+def get_client(headers: Optional[Dict] = None) -> PooledClient:
+    """获取使用进程级连接池的客户端"""
+    return PooledClient(headers)
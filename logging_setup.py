@@ -0,0 +1,168 @@
+"""
+异步日志管道
+- 请求线程只把日志记录放入有界队列（QueueHandler），格式化和写入stderr由后台线程（QueueListener）完成
+- 队列满时丢弃记录并计数，不阻塞请求线程
+- 详细日志（extra=DETAIL，如完整结果字典、AI原始响应）按请求采样，
+  采样率为 LOG_DETAIL_SAMPLE_RATE；WARNING 及以上级别不受采样影响
+- 调用方使用 %s 占位符传参（惰性格式化），被级别或采样过滤掉的记录不会被格式化
+- fork 出的子进程（如 gunicorn 预加载后的 worker）不继承后台线程，子进程中自动换新队列并重新启动
+"""
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+# 标记按请求采样的详细日志: logger.info("结果: %s", result, extra=DETAIL)
+DETAIL = {'detail': True}
+
+_detail_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar('log_detail_sampled', default=None)
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['DroppingQueueHandler'] = None
+_sample_rate = 1.0
+_configured = False
+_setup_lock = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def begin_request_sampling() -> bool:
+    """在请求开始时决定本次请求是否输出详细日志"""
+    sampled = _sample_rate >= 1 or random.random() < _sample_rate
+    _detail_sampled.set(sampled)
+    return sampled
+
+
+def detail_enabled() -> bool:
+    """当前上下文是否输出详细日志（请求之外的上下文，如脚本和后台任务，始终输出）"""
+    sampled = _detail_sampled.get()
+    return True if sampled is None else sampled
+
+
+class DetailSampleFilter(logging.Filter):
+    """丢弃未被采样请求中的详细日志"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'detail', False) and record.levelno < logging.WARNING:
+            return detail_enabled()
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    非阻塞的队列Handler
+    - 队列满时丢弃记录并计数
+    - 只在请求线程中合并消息参数（避免参数对象之后被修改），时间戳等格式化留给后台线程
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # traceback对象不能跨线程保留，异常文本在这里生成
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: int = logging.INFO):
+    """
+    配置根日志（进程内只生效一次）
+
+    环境变量:
+        LOG_LEVEL: 覆盖日志级别（DEBUG/INFO/WARNING/ERROR）
+        LOG_ASYNC: 是否使用异步队列（默认1）
+        LOG_QUEUE_SIZE: 队列容量（默认10000）
+        LOG_DETAIL_SAMPLE_RATE: 详细日志的请求采样率（0-1，默认1）
+    """
+    global _listener, _queue_handler, _sample_rate, _configured
+
+    with _setup_lock:
+        if _configured:
+            return
+        _configured = True
+
+        level_name = os.getenv('LOG_LEVEL')
+        if level_name:
+            level = logging.getLevelName(level_name.upper())
+            if not isinstance(level, int):
+                level = logging.INFO
+        _sample_rate = min(max(_env_float('LOG_DETAIL_SAMPLE_RATE', 1.0), 0.0), 1.0)
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        root = logging.getLogger()
+        root.setLevel(level)
+
+        if os.getenv('LOG_ASYNC', '1') == '1':
+            _queue_handler = DroppingQueueHandler(queue.Queue(int(_env_float('LOG_QUEUE_SIZE', 10000))))
+            _queue_handler.addFilter(DetailSampleFilter())
+            root.addHandler(_queue_handler)
+            _listener = logging.handlers.QueueListener(_queue_handler.queue, stream_handler)
+            _listener.start()
+            atexit.register(stop_logging)
+        else:
+            stream_handler.addFilter(DetailSampleFilter())
+            root.addHandler(stream_handler)
+
+
+def _restart_listener_in_child():
+    """fork后的子进程：父进程的后台线程不会被继承，换一个新队列（丢弃父进程未写出的记录）并重新启动"""
+    global _listener
+    if _queue_handler is None or _listener is None:
+        return
+    _queue_handler.queue = queue.Queue(_queue_handler.queue.maxsize)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_listener.handlers)
+    _listener.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def stop_logging():
+    """停止后台线程并输出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    """日志管道统计"""
+    stats = {
+        'async': _queue_handler is not None,
+        'detail_sample_rate': _sample_rate
+    }
+    if _queue_handler is not None:
+        stats.update({
+            'enqueued': _queue_handler.enqueued,
+            'dropped': _queue_handler.dropped,
+            'queue_depth': _queue_handler.queue.qsize()
+        })
+    return stats
@@ -0,0 +1,198 @@
+"""
+分阶段耗时指标
+- stage() / timed(): 记录一个阶段（缓存查询、搜索策略、解析、匹配、短评、备用API、VLM）的耗时，
+  写入进程级直方图，并累加到当前请求的耗时表中
+- 当前请求的耗时表通过 contextvars 传递，提交到线程池的任务需用 contextvars.copy_context().run 执行
+- render_prometheus(): Prometheus 文本格式输出，供 /metrics 使用
+- server_timing_header(): 生成 Server-Timing 响应头
+"""
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 阶段耗时的直方图桶（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """线程安全的带标签直方图（累计桶，与Prometheus语义一致）"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}  # 标签值 -> [各桶计数, 总和, 总数]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+        for label_values, (counts, total, count) in sorted(snapshot.items()):
+            labels = _format_labels(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(zip(self.label_names, label_values), le=bound)} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(zip(self.label_names, label_values), le="+Inf")} {count}')
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]], le=None) -> str:
+    items = [f'{name}="{_escape(value)}"' for name, value in pairs]
+    if le is not None:
+        items.append(f'le="{le}"')
+    return '{' + ','.join(items) + '}' if items else ''
+
+
+stage_duration = Histogram(
+    'shuping_stage_duration_seconds', '各处理阶段耗时', ('stage',)
+)
+request_duration = Histogram(
+    'shuping_http_request_duration_seconds', 'HTTP请求处理耗时（服务端）', ('endpoint', 'method', 'status')
+)
+
+
+class RequestTimings:
+    """单个请求内各阶段的累计耗时（毫秒），可被多个线程写入"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._stages: Dict[str, List[float]] = {}  # 阶段 -> [累计毫秒, 次数]
+        self._lock = threading.Lock()
+
+    def add(self, stage_name: str, elapsed_ms: float):
+        with self._lock:
+            entry = self._stages.setdefault(stage_name, [0.0, 0])
+            entry[0] += elapsed_ms
+            entry[1] += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(total, 2) for name, (total, _) in self._stages.items()}
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+
+_current_timings: contextvars.ContextVar[Optional[RequestTimings]] = \
+    contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request() -> RequestTimings:
+    """为当前请求（上下文）创建新的耗时表"""
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+def record_stage(stage_name: str, elapsed: float):
+    """记录一次阶段耗时（秒）"""
+    stage_duration.observe(elapsed, stage_name)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage_name, elapsed * 1000)
+
+
+@contextmanager
+def stage(stage_name: str):
+    """计时一个阶段（异常时同样记录）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage_name, time.perf_counter() - start)
+
+
+def timed(stage_name: str):
+    """方法/函数计时装饰器"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(timings: RequestTimings) -> str:
+    """Server-Timing 响应头：各阶段累计耗时 + 服务端总耗时"""
+    parts = [f"{name};dur={total}" for name, total in timings.as_dict().items()]
+    parts.append(f"total;dur={timings.total_ms():.2f}")
+    return ', '.join(parts)
+
+
+def _flatten(prefix: str, data: Dict, labels: Tuple, label_keys: Dict[str, str], out: List):
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            label_name = label_keys.get(path)
+            if label_name:
+                # 动态键（主机、熔断器名称）作为标签
+                for label_value, child in value.items():
+                    if isinstance(child, dict):
+                        _flatten(path, child, labels + ((label_name, label_value),), label_keys, out)
+            else:
+                _flatten(path, value, labels, label_keys, out)
+        elif isinstance(value, bool):
+            out.append((path, labels, int(value)))
+        elif isinstance(value, (int, float)):
+            out.append((path, labels, value))
+
+
+def render_gauges(stats: Dict, label_keys: Dict[str, str], prefix: str = 'shuping') -> List[str]:
+    """
+    把嵌套统计字典中的数值展开为 gauge
+
+    Args:
+        label_keys: 路径 -> 标签名，该路径下的键作为标签值（如 {'http_pool.hosts': 'host'}）
+    """
+    samples = []
+    _flatten('', stats, (), label_keys, samples)
+
+    # 同名指标的样本必须连续输出
+    families: Dict[str, List[str]] = {}
+    for path, labels, value in samples:
+        name = f"{prefix}_{path}".replace('.', '_').replace('-', '_')
+        families.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(family)
+    return lines
+
+
+def render_prometheus(stats: Dict = None, label_keys: Dict[str, str] = None) -> str:
+    """Prometheus 文本格式（text/plain; version=0.0.4）"""
+    lines = stage_duration.render() + request_duration.render()
+    if stats:
+        lines += render_gauges(stats, label_keys or {})
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,144 @@
+"""
+出站限速
+按主机的自适应令牌桶（AIMD）：正常响应时速率线性增加，
+遇到 403 / 429 / 慢响应 / 请求异常时速率乘性减小。
+"""
+import os
+import threading
+import time
+import urllib.parse
+from typing import Dict
+
+
+class RateLimitExceeded(Exception):
+    """在最长等待时间内拿不到令牌"""
+
+
+class AdaptiveTokenBucket:
+    """线程安全的AIMD令牌桶"""
+
+    # 触发降速的状态码
+    THROTTLE_STATUS = (403, 429)
+
+    def __init__(self, rate: float = 5.0, burst: float = 10, min_rate: float = 0.5, max_rate: float = 20.0,
+                 increase: float = 0.1, decrease: float = 0.5, slow_threshold: float = 3.0,
+                 max_wait: float = 2.0, decrease_interval: float = 1.0):
+        """
+        Args:
+            rate: 初始速率（请求/秒）
+            burst: 桶容量（允许的突发请求数）
+            min_rate / max_rate: 速率上下限
+            increase: 每次正常响应增加的速率（加性增）
+            decrease: 遇到限流信号时速率乘以的系数（乘性减）
+            slow_threshold: 响应耗时超过该值（秒）视为慢响应
+            max_wait: 排队等待令牌的最长时间（秒），超过则拒绝
+            decrease_interval: 两次降速之间的最小间隔（秒），避免同一波失败连续降速
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_threshold = slow_threshold
+        self.max_wait = max_wait
+        self.decrease_interval = decrease_interval
+
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+        self.granted = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, max_wait: float = None) -> bool:
+        """
+        获取一个令牌，必要时排队等待
+
+        令牌不足时预留一个（令牌数可为负），按当前速率计算需要等待的时间；
+        等待时间超过 max_wait 则不预留并返回False。
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                self.rejected += 1
+                return False
+            self._tokens -= 1
+            self.granted += 1
+
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def record(self, status_code: int = None, elapsed: float = None, error: bool = False):
+        """根据响应结果调整速率"""
+        throttled = error or status_code in self.THROTTLE_STATUS or \
+            (elapsed is not None and elapsed >= self.slow_threshold)
+
+        with self._lock:
+            now = time.monotonic()
+            if throttled:
+                self.throttled += 1
+                if now - self._last_decrease >= self.decrease_interval:
+                    self._refill(now)
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self._last_decrease = now
+            else:
+                self._refill(now)
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'rate': round(self.rate, 3),
+                'tokens': round(min(self.burst, self._tokens + (time.monotonic() - self._updated_at) * self.rate), 3),
+                'granted': self.granted,
+                'rejected': self.rejected,
+                'throttled': self.throttled
+            }
+
+
+class RateLimiterRegistry:
+    """按主机维护令牌桶"""
+
+    def __init__(self, **bucket_kwargs):
+        self.bucket_kwargs = bucket_kwargs
+        self._buckets: Dict[str, AdaptiveTokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> AdaptiveTokenBucket:
+        """获取URL所属主机的令牌桶"""
+        host = urllib.parse.urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    bucket = AdaptiveTokenBucket(**self.bucket_kwargs)
+                    self._buckets[host] = bucket
+        return bucket
+
+    def stats(self) -> Dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.stats() for host, bucket in buckets.items()}
+
+
+# 豆瓣出站限速（每个worker进程各自一份）
+douban_rate_limiters = RateLimiterRegistry(
+    rate=float(os.getenv('DOUBAN_RATE_LIMIT', 5)),
+    burst=float(os.getenv('DOUBAN_RATE_BURST', 10)),
+    min_rate=float(os.getenv('DOUBAN_RATE_MIN', 0.5)),
+    max_rate=float(os.getenv('DOUBAN_RATE_MAX', 20)),
+    max_wait=float(os.getenv('DOUBAN_RATE_MAX_WAIT', 2)),
+    slow_threshold=float(os.getenv('DOUBAN_SLOW_THRESHOLD', 3))
+)
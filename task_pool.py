@@ -0,0 +1,62 @@
+"""
+优先级后台任务池
+固定数量的工作线程按优先级（数值越小越先执行）取任务，同优先级按提交顺序执行。
+"""
+import itertools
+import logging
+import queue
+import threading
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class PriorityTaskPool:
+    """线程安全的优先级任务池（工作线程为守护线程，首次提交时启动）"""
+
+    def __init__(self, max_workers: int = 2, thread_name_prefix: str = 'task'):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads = []
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+
+    def _start_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                thread = threading.Thread(
+                    target=self._worker, name=f"{self.thread_name_prefix}_{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            _, _, fn, args, kwargs = self._queue.get()
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                logger.warning("⚠️  后台任务失败: %s", e)
+            finally:
+                self.completed += 1
+                self._queue.task_done()
+
+    def submit(self, priority: int, fn: Callable, *args, **kwargs):
+        """提交任务，priority 越小越先执行"""
+        if not self._threads:
+            self._start_workers()
+        self.submitted += 1
+        self._queue.put((priority, next(self._seq), fn, args, kwargs))
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.max_workers,
+            'queued': self._queue.qsize(),
+            'submitted': self.submitted,
+            'completed': self.completed
+        }
@@ -0,0 +1,84 @@
+"""
+书名匹配
+DoubanScraper 与本地书库共用的书名规范化与匹配规则，以及搜索候选的相似度排序
+"""
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+# 豆瓣页面标题中需要去除的标记
+TITLE_MARKS = ['[书籍]', '(豆瓣)', '（豆瓣）']
+
+# 包含关系匹配时，较短标题与较长标题的最小长度比
+MIN_LENGTH_RATIO = 0.7
+
+# 不满足包含关系时，候选仍可入选的最低标题相似度
+MIN_SIMILARITY = 0.8
+
+# 作者一致时的加分
+AUTHOR_BONUS = 0.1
+
+
+def normalize_title(title: str) -> str:
+    """规范化书名：去空白、转小写、去除豆瓣标记"""
+    clean = title.strip().lower()
+    for mark in TITLE_MARKS:
+        clean = clean.replace(mark.lower(), '').strip()
+    return clean
+
+
+def is_title_match(search_title: str, found_title: str) -> bool:
+    """判断标题是否匹配：完全相同，或互相包含且长度比不低于0.7"""
+    search_clean = search_title.strip().lower()
+    found_clean = normalize_title(found_title)
+
+    if search_clean == found_clean:
+        return True
+
+    if search_clean in found_clean or found_clean in search_clean:
+        min_len = min(len(search_clean), len(found_clean))
+        max_len = max(len(search_clean), len(found_clean))
+        if min_len / max_len >= MIN_LENGTH_RATIO:
+            return True
+
+    return False
+
+
+def title_similarity(search_title: str, found_title: str) -> float:
+    """规范化后的标题相似度（0-1），完全相同为1"""
+    search_clean = normalize_title(search_title)
+    found_clean = normalize_title(found_title)
+    if not search_clean or not found_clean:
+        return 0.0
+    if search_clean == found_clean:
+        return 1.0
+    return SequenceMatcher(None, search_clean, found_clean).ratio()
+
+
+def _author_matches(author: str, found_author: str) -> bool:
+    author_clean = author.strip().lower()
+    found_clean = found_author.strip().lower()
+    return bool(author_clean and found_clean) and (author_clean in found_clean or found_clean in author_clean)
+
+
+def rank_candidates(search_title: str, candidates: List[Dict], author: Optional[str] = None) -> List[Dict]:
+    """
+    按相似度排序搜索候选
+
+    只保留满足 is_title_match 或相似度不低于 MIN_SIMILARITY 的候选；
+    得分 = 标题相似度 + 作者一致加分，同分时保持原有顺序（候选应按来源优先级和页面顺序传入）
+
+    Args:
+        candidates: 至少包含 title 的字典列表，可选 author
+    """
+    ranked = []
+    for index, candidate in enumerate(candidates):
+        found_title = candidate.get('title') or ''
+        similarity = title_similarity(search_title, found_title)
+        if similarity < MIN_SIMILARITY and not is_title_match(search_title, found_title):
+            continue
+        score = similarity
+        if author and _author_matches(author, candidate.get('author') or ''):
+            score += AUTHOR_BONUS
+        ranked.append((-score, index))
+    ranked.sort()
+    return [candidates[index] for _, index in ranked]